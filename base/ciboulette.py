@@ -3,6 +3,8 @@ Ciboulette class
 """
 
 import time
+import struct
+import requests
 import numpy as np
 import math 
 import matplotlib.pyplot as plt
@@ -19,11 +21,13 @@ from astroquery.simbad import Simbad
 from alpaca.camera import *
 from alpaca.filterwheel import FilterWheel
 from alpaca.telescope import Telescope
+from alpaca.focuser import Focuser
 from ciboulette.base import constant
 from ciboulette.sector import projection
 from ciboulette.sector import maps
 from ciboulette.utils import exposure as Exp
 from ciboulette.utils import planning as Pln
+from ciboulette.utils import sequencer as Seq
 from ciboulette.aavso.webobs import WebObs, datadownload, vsx
 
 class Ciboulette(object):
@@ -56,6 +60,7 @@ class Ciboulette(object):
         self._pressure = 0
         self._humidity  = 0
         self._temperature  = 0
+        self.writer = None
         self._description = 'Observatory UT1, 10 route de la mare maury, France. @' + str(self.latitude) + ',' + str(self.longitude) + ',' + str(self.elevation) + 'm'
 
     @property
@@ -278,11 +283,12 @@ class Ciboulette(object):
         """
         self.filter_name = string
     
-    def filterwheel(self,filterwheel):
+    def filterwheel(self,filterwheel,wait=True):
         """
         Set filter of filterweel
          filterwheel (Filterwheel): Filterwheel object (Alpaca or Indilib).
          filter_name (str): Filter name.           
+         wait (bool): Return once the filter is in place.
         """       
         filter_number = 0
         if isinstance(filterwheel, FilterWheel):
@@ -292,6 +298,66 @@ class Ciboulette(object):
         if self.filter_name in filter_names:
             filter_number = filter_names.index(self.filter_name)
             filterwheel.position(filter_number)
+            if wait:
+                if isinstance(filterwheel, FilterWheel):
+                    # Alpaca reports -1 while the wheel is moving
+                    while filterwheel.position() == -1:
+                        time.sleep(0.1)
+                else:
+                    filterwheel.get_vector(filterwheel.driver, "FILTER_SLOT").wait_for_ok_timeout(60)
+
+    def focuser(self,focuser,position):
+        """
+        Move the focuser and return once it is in place
+         focuser (Focuser): Focuser object (Alpaca or Indilib).
+         position (int): Absolute position in steps.
+        """
+        if isinstance(focuser, Focuser):
+            focuser.Move(position)
+            while focuser.IsMoving:
+                time.sleep(0.1)
+        else:
+            focuser.move(position)
+
+    def guider(self,guider,pixels=1.5,settletime=10,timeout=60):
+        """
+        Start guiding and return once the guider has settled
+         guider (Guider): PHD2 guider object.
+         pixels (float): Settle distance in pixels.
+         settletime (float): Time in seconds within pixels.
+         timeout (float): Settle timeout in seconds.
+        """
+        guider.Guide(pixels, settletime, timeout)
+        while True:
+            s = guider.CheckSettling()
+            if s.Done:
+                if s.Status != 0:
+                    raise Exception("Guider settle failed: " + str(s.Error))
+                return
+            time.sleep(0.5)
+
+    def prepare(self,telescope=None,filterwheel=None,focuser=None,focus=None,guider=None,timeout=None):
+        """
+        Slew, change filter, focus and start guiding before an exposure, the devices move at the same time
+         telescope (Telescope): Telescope object (Alpaca or Indilib), slews to RA and DEC.
+         filterwheel (Filterwheel): Filterwheel object (Alpaca or Indilib), set to filter_name.
+         focuser (Focuser): Focuser object (Alpaca or Indilib), moved to focus.
+         focus (int): Focuser position in steps.
+         guider (Guider): PHD2 guider object, guiding starts once the slew is done.
+         timeout (float): Timeout in seconds, None waits forever.
+        Return the timings of the steps in an astropy table, the elapsed time is in its meta.
+        """
+        seq = Seq.Sequencer()
+        if telescope is not None:
+            seq.add('slew', self.slewtocoordinates, telescope)
+        if filterwheel is not None:
+            seq.add('filter', self.filterwheel, filterwheel)
+        if focuser is not None and focus is not None:
+            seq.add('focus', self.focuser, focuser, focus)
+        if guider is not None:
+            seq.add('guider', self.guider, guider, after=('slew',) if telescope is not None else ())
+        seq.run(timeout)
+        return seq.timings
 
     @property
     def coordinates(self):
@@ -350,17 +416,24 @@ class Ciboulette(object):
             if elevation >= 0 and elevation <= 8000:
                 self.elevation = elevation    
 
-    def slewtocoordinates(self,telescope):
+    def slewtocoordinates(self,telescope,wait=True):
         """
         Slew RA and DEC to telescope 
          telescope (Telescope): Telescope object (Alpaca or Indilib).
          ra (float): Hours.
          dec (float): Degrees           
+         wait (bool): Return once the slew is done, else return the future of the slew (Indilib).
+        With Indilib the end of the slew is notified by the mount, there is no polling.
         """
-        telescope.slewtocoordinates(self.ra,self.dec)
         if isinstance(telescope, Telescope):
+            telescope.slewtocoordinates(self.ra,self.dec)
             while telescope.slewing():
                 time.sleep(1)
+            return None
+        future = telescope.slew(self.ra,self.dec)
+        if wait:
+            return future.result()
+        return future
 
     
     def synctocoordinates(self,telescope):
@@ -530,8 +603,7 @@ class Ciboulette(object):
             camera.NumY = camera.CameraYSize // camera.BinY
 
             camera.StartExposure(self._exp_time,True)
-            while not camera.ImageReady:
-                time.sleep(0.5)
+            self.waitimageready(camera)
 
             self.binXY = camera.BinX
             self.pixelXY = camera.PixelSizeX
@@ -543,46 +615,104 @@ class Ciboulette(object):
 
             if camera.CanSetCCDTemperature:
                 self._temperature = camera.CCDTemperature
-            # Translate picture
-            data_ccd = camera.ImageArray
-
-            imginfo = camera.ImageArrayInfo
-            if imginfo.ImageElementType == ImageArrayElementTypes.Int32:
-                if camera.MaxADU <= 65535:
-                    imgDataType = np.uint16 # Required for BZERO & BSCALE to be written
-                else:
-                    imgDataType = np.int32
-            elif imginfo.ImageElementType == ImageArrayElementTypes.Double:
-                imgDataType = np.float64
-
-            if imginfo.Rank == 2:
-                nda = np.array(data_ccd, dtype=imgDataType).transpose()
-            else:
-                nda = np.array(data_ccd, dtype=imgDataType).transpose(2,1,0)
+            # Translate picture, binary ImageBytes if the server supports it
+            nda = self.imagebytes(camera)
             #Vertical inversion if necessary
             #data_real = np.fliplr(data_int16)
-            #Create simple fits
-            hdu = fits.PrimaryHDU(data=nda)
-            file_name = self.dataset+'/_'+self.observer_name+'_'+self.object_name+'_'+str(self._frameid)+'.fits'
-            fits.writeto(file_name, hdu.data, hdu.header, overwrite=True)  
+            self.writefits(nda)
         else:
-            camera.binning({'X':self.binXY, 'Y':self.binXY})
-            hdul = camera.expose(self._exp_time)
-            i = self._exp_time + (((self.naxis1 * self.naxis2)/1048576) *2)
-            while i > 0:
-                time.sleep(1)
-                i = i - 1
-            
-            data_ccd = camera.imagearray()
-            data_new = np.rot90(data_ccd)
-            data_int16 = data_new.astype(np.int16)       
+            camera.binning = {'X':self.binXY, 'Y':self.binXY}
+            # expose returns as soon as the image has been received
+            hdul = camera.expose(self._exp_time, self.frametype)
+            if hdul is None:
+                raise Exception('No image received from '+str(camera.driver)+' for frame '+str(self._frameid))
             #Vertical inversion if necessary
             #data_real = np.fliplr(data_int16)
-            #Create simple fits
+            self.writefits(hdul[0].data, hdul[0].header)
+
+    def waitimageready(self,camera):
+        """
+        Wait for the image of an alpaca camera
+         camera (object): Camera alpaca object.
+        The image cannot be ready before the end of the exposure, ImageReady is polled
+        from then on, every 20 ms at first and up to every 0.5 s for long readouts.
+        """
+        time.sleep(self._exp_time)
+        delay = 0.02
+        while not camera.ImageReady:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def imagebytes(self,camera,timeout=60):
+        """
+        Return the image of an alpaca camera as a numpy array (Y, X)
+         camera (object): Camera alpaca object.
+         timeout (float): Timeout of the download in seconds.
+        The image is asked for with the binary ImageBytes encoding and mapped without copy
+        onto a numpy array. A server without ImageBytes answers with the JSON ImageArray,
+        which is decoded from the same response, the image is downloaded once.
+        """
+        response = requests.get(camera.base_url+'/imagearray', headers={'Accept': 'application/imagebytes'}, timeout=timeout)
+        response.raise_for_status()
+        if 'application/imagebytes' in response.headers.get('Content-Type', ''):
+            content = response.content
+            # Metadata: 11 little endian int32
+            (version, error, client_id, server_id, data_start, image_type,
+             transmission_type, rank, dim1, dim2, dim3) = struct.unpack_from('<11i', content)
+            if error != 0:
+                raise Exception('Alpaca error %d: %s' % (error, content[data_start:].decode('utf-8', 'replace')))
+            if transmission_type not in constant.ImageBytes_dtypes:
+                raise Exception('Alpaca ImageBytes transmission type %d not supported' % transmission_type)
+            if rank == 2:
+                shape = (dim1, dim2)
+            else:
+                shape = (dim1, dim2, dim3)
+            nda = np.frombuffer(content, dtype=constant.ImageBytes_dtypes[transmission_type], offset=data_start).reshape(shape)
+        else:
+            j = response.json()
+            if j.get('ErrorNumber', 0) != 0:
+                raise Exception('Alpaca error %d: %s' % (j['ErrorNumber'], j.get('ErrorMessage', '')))
+            image_type = j['Type']
+            rank = j['Rank']
+            nda = np.array(j['Value'])
+        # Alpaca images are indexed [X][Y]
+        nda = nda.transpose() if rank == 2 else nda.transpose(2,1,0)
+        if image_type == ImageArrayElementTypes.Int32.value and nda.dtype != np.uint16:
+            if camera.MaxADU <= 65535:
+                nda = nda.astype(np.uint16) # Required for BZERO & BSCALE to be written
+            else:
+                nda = nda.astype(np.int32)
+        elif image_type == ImageArrayElementTypes.Double.value:
+            nda = nda.astype(np.float64)
+        return nda
+
+    def sequence(self,camera,count,workers=2,queued=2):
+        """
+        Take a sequence of count frames with the current exposure and write fits files
+         camera (object): Camera alpaca or indilib object.
+         count (int): Number of frames.
+         workers (int): Number of frames decoded and written at the same time (indilib only).
+         queued (int): Number of frames waiting for a worker before the next exposure waits (indilib only).
+        Frames are named after the frame ID followed by their number in the sequence.
+        With indilib the next exposure starts as soon as the previous image has been received,
+        the images are decoded and written meanwhile.
+        """
+        frameid = self._frameid
+        if isinstance(camera, Camera):
+            for index in range(count):
+                self._frameid = str(frameid)+'_'+str(index+1)
+                self.camera(camera)
+            self._frameid = frameid
+            return
+        camera.binning = {'X':self.binXY, 'Y':self.binXY}
 
-            file_name = self.dataset+'/_'+self.observer_name+'_'+self.object_name+'_'+str(self._frameid)+'.fits'
-            fits.writeto(file_name, hdul[0].data, hdul[0].header, overwrite=True)  
-        self.extendedfits()           
+        def write(index, hdul):
+            frame = str(frameid)+'_'+str(index+1)
+            header = hdul[0].header
+            date = header.get('DATE-OBS', Time(Time.now(), format='fits', scale='utc', out_subfmt='date_hms').value)
+            self.writefits(hdul[0].data, header, frame, date)
+
+        camera.sequence(count, self._exp_time, self.frametype, callback=write, workers=workers, queued=queued)
 
     def frameid(self):
         """
@@ -595,6 +725,13 @@ class Ciboulette(object):
         Return datatype value
         """
         return self._datatype
+
+    @property
+    def frametype(self):
+        """
+        Return the INDI frame type (Light, Dark, Flat or Bias) of datatype
+        """
+        return constant.INDI_frame_types.get(self._datatype, 'Light')
     
     def expose(self):
         """
@@ -621,85 +758,44 @@ class Ciboulette(object):
     
     def extendedfits(self):
         """
-        Write fits header extended and fits file
+        Write fits header extended and fits file from the _ fits file of the current frame
         """
         fits_file = self.dataset+'/_'+self.observer_name+'_'+self.object_name+'_'+str(self._frameid)+'.fits'
-        
-        fits.setval(fits_file, 'PIXSIZE1', value=self.pixelXY, comment='[um] Pixel Size X, binned', savecomment=True)
-        fits.setval(fits_file, 'PIXSIZE2', value=self.pixelXY, comment='[um] Pixel Size Y, binned', savecomment=True)
-        fits.setval(fits_file, 'XBINNING', value=self.binXY, comment='Binning factor X', savecomment=True)
-        fits.setval(fits_file, 'YBINNING', value=self.binXY, comment='Binning factor Y', savecomment=True)
-        fits.setval(fits_file, 'EXPTIME', value=self._exp_time, comment='[s] Total Exposure Time', savecomment=True)
-        fits.setval(fits_file, 'OBJECT', value=self.object_name, comment='Observed object name', savecomment=True)
-        fits.setval(fits_file, 'OBSERVER', value=self.observer_name, comment='Observed name', savecomment=True)
-        fits.setval(fits_file, 'TELESCOP', value=self.telescope_name, comment='Telescope name', savecomment=True)
-        fits.setval(fits_file, 'INSTRUME', value=self.instrument, comment='Instrument used for acquisition', savecomment=True)                         
-        fits.setval(fits_file, 'ROWORDER', value='TOP-DOWN', comment='Order of the rows in image array', savecomment=True)                 
-        fits.setval(fits_file, 'CCD-TEMP', value=self._temperature, comment='[C] CCD temperature (Celsius)', savecomment=True) 
-        fits.setval(fits_file, 'FILTER', value=self.filter_name, comment='Filter info', savecomment=True)     
-        fits.setval(fits_file, 'SITELAT', value=self.latitude, comment='[deg] Observatory latitude', savecomment=True) 
-        fits.setval(fits_file, 'SITELONG', value=self.longitude, comment='[deg] Observatory longitude', savecomment=True)
-        fits.setval(fits_file, 'SITEELEV', value=self.elevation, comment='[deg] Observatory elevation', savecomment=True) 
-        fits.setval(fits_file, 'SWCREATE', value=self.api_version, comment='Driver create', savecomment=True) 
-        fits.setval(fits_file, 'FOCALLEN', value=self.focal, comment='[mm] Telescope focal length', savecomment=True) 
-        fits.setval(fits_file, 'FRAMEX', value=0, comment='Frame start x', savecomment=True)
-        fits.setval(fits_file, 'FRAMEY', value=0, comment='Frame start y', savecomment=True)                                                                   
-        fits.setval(fits_file, 'DATE-OBS', value=self._date, comment='UTC start date of observation', savecomment=True)
-        fits.setval(fits_file, 'RADESYSA', value='ICRS', comment='Equatorial coordinate system', savecomment=True)
-        fits.setval(fits_file, 'FRAMEID', value=self._frameid, comment='Frame ID', savecomment=True)
-        fits.setval(fits_file, 'EQUINOX', value=2000.0, comment='Equinox date', savecomment=True)
-        fits.setval(fits_file, 'DATATYPE', value=self._datatype, comment='Type of data', savecomment=True)
-        fits.setval(fits_file, 'MJD-OBS', value=0.0, comment='MJD of start of obseration', savecomment=True)
-        fits.setval(fits_file, 'JD-OBS', value=0.0, comment='JD of start of obseration', savecomment=True)
-
-        hdu = fits.open(fits_file)[0]
-        header = hdu.header
-
-        # Modification telescope name header
-        header['TELESCOP'] = self.telescope_name
-
-        # Modification JD and MJD header
-        date_obs = header['DATE-OBS']
-        time_obs = Time(header['DATE-OBS'])
-        header['JD-OBS'] = time_obs.jd
-        header['MJD-OBS'] = time_obs.mjd
-
-        # Elements for CRVAL
-        RA_deg = 15 * self.ra
-        DEC_deg = self.dec
-
-        # Elements for CRPIX
-        crpix1 = int(header['NAXIS1'])/2
-        crpix2 = int(header['NAXIS2'])/2
-
-        # Element for CDELT
-        cdelt1 = (206*int(header['PIXSIZE1'])*int(header['XBINNING'])/self.focal)/3600
-        cdelt2 = (206*int(header['PIXSIZE2'])*int(header['YBINNING'])/self.focal)/3600
-
-        # Header WCS
-        w = wcs.WCS(naxis=2)
-        w.wcs.ctype = ["RA---TAN", "DEC--TAN"]
-        # CRVAL position
-        w.wcs.crval = [RA_deg, DEC_deg] 
-        # CRPIX Vecteur à 2 éléments donnant les coordonnées X et Y du pixel de référence 
-        # (def = NAXIS / 2) dans la convention FITS (le premier pixel est 1,1)
-        w.wcs.crpix = [crpix1, crpix2]
-        # CDELT Vecteur à 2 éléments donnant l'incrément physique au pixel de référence
-        w.wcs.cdelt = [-cdelt1, cdelt2] 
-
-        # Now, write out the WCS object as a FITS header
-        hdu.header = header + w.to_header()
-        # Header and data
-        hdr = hdu.header
-        data = hdu.data
-        # Sauvegarde
-        fits_file_name = self.dataset+'/'+self.observer_name+'_'+self.object_name+'_'+str(self._frameid)+'.fits'
-        fits.writeto(fits_file_name, data, hdr, overwrite=True)
+        with fits.open(fits_file, memmap=False) as hdul:
+            self.writefits(hdul[0].data, hdul[0].header)
+
+    def writefits(self,data,header=None,frameid=None,date=None):
+        """
+        Write fits file with the header extended, in a single pass
+         data (ndarray): Image data.
+         header (object): FITS header received with the image, if any.
+         frameid (str): Frame ID, the current one if None.
+         date (str): UTC start date of observation, the current one if None.
+        The file is queued to the writer if one is set (see FitsWriter).
+        """
+        if frameid is None:
+            frameid = self._frameid
+        # The header is built in memory, NAXIS1 and NAXIS2 are taken from the data
+        hdu = fits.PrimaryHDU(data=data, header=header)
+        hdr = self.extendedhdr(hdu.header, frameid, date)
+        fits_file_name = self.dataset+'/'+self.observer_name+'_'+self.object_name+'_'+str(frameid)+'.fits'
+        if self.writer is not None:
+            # Written in the background by the FitsWriter
+            self.writer.write(fits_file_name, data, hdr)
+        else:
+            fits.writeto(fits_file_name, data, hdr, overwrite=True)
 
-    def extendedhdr(self,header):
+    def extendedhdr(self,header,frameid=None,date=None):
         """
         Set header extended 
+         header (object): FITS header.
+         frameid (str): Frame ID, the current one if None.
+         date (str): UTC start date of observation, the current one if None.
         """     
+        if frameid is None:
+            frameid = self._frameid
+        if date is None:
+            date = self._date
         hdr = header
         hdr.set('PIXSIZE1', self.pixelXY, '[um] Pixel Size X, binned') 
         hdr.set('PIXSIZE2', self.pixelXY, '[um] Pixel Size Y, binned')
@@ -720,9 +816,9 @@ class Ciboulette(object):
         hdr.set('FOCALLEN', self.focal,'[mm] Telescope focal length') 
         hdr.set('FRAMEX', 0, 'Frame start x')
         hdr.set('FRAMEY', 0, 'Frame start y')                                                                   
-        hdr.set('DATE-OBS', self._date, 'UTC start date of observation')
+        hdr.set('DATE-OBS', date, 'UTC start date of observation')
         hdr.set('RADESYSA', 'ICRS', 'Equatorial coordinate system')
-        hdr.set('FRAMEID', self._frameid, 'Frame ID')
+        hdr.set('FRAMEID', frameid, 'Frame ID')
         hdr.set('EQUINOX', 2000.0, 'Equinox date')
         hdr.set('DATATYPE', self._datatype, 'Type of data')
         hdr.set('MJD-OBS', 0.0, 'MJD of start of obseration')
@@ -28,3 +28,15 @@ MAST_t_exptime                = 't_exptime'
 MAST_dataproduct_type         = 'dataproduct_type'
 MAST_obs_title                = 'obs_title'
 
+
+"""
+Alpaca ImageBytes constents
+ Numpy types of the ImageBytes transmission element types
+"""
+ImageBytes_dtypes             = {1: '<i2', 2: '<i4', 3: '<f8', 4: '<f4', 5: '<u8', 6: 'u1', 7: '<i8', 8: '<u2', 9: '<u4'}
+
+"""
+INDI frame types constents
+ CCD_FRAME_TYPE labels of the Exposure datatypes
+"""
+INDI_frame_types              = {'Intensity': 'Light', 'Light': 'Light', 'Ligth': 'Light', 'Black': 'Dark', 'Dark': 'Dark', 'Flat': 'Flat', 'Bias': 'Bias'}
@@ -0,0 +1,50 @@
+"""
+Tests of the Ciboulette class
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("alpaca")
+pytest.importorskip("astroquery")
+
+from ciboulette.base import ciboulette
+from ciboulette.utils import exposure
+
+
+class FakeCCD(object):
+    """
+    A CCDCam with the frame types of the INDI CCD simulator, sequence calls back with blank frames
+    """
+    frame_types = ['Light', 'Bias', 'Dark', 'Flat']
+
+    def __init__(self):
+        self.binning = None
+        self.exptypes = []
+
+    def sequence(self, count, exptime=1.0, exptype="Light", filter=None, callback=None, workers=2, queued=2):
+        if exptype not in self.frame_types:
+            raise Exception("Invalid exposure type, %s. Must be one of %s'." % (exptype, repr(self.frame_types)))
+        self.exptypes.append(exptype)
+        from astropy.io import fits
+        for index in range(count):
+            callback(index, fits.HDUList([fits.PrimaryHDU(np.zeros((4, 4), dtype=np.uint16))]))
+
+
+@pytest.mark.parametrize("datatype, frametype", [('Intensity', 'Light'), ('Ligth', 'Light'),
+                                                 ('Black', 'Dark'), ('Flat', 'Flat'), ('Bias', 'Bias')])
+def test_sequence_with_exposure(tmp_path, datatype, frametype):
+    cib = ciboulette.Ciboulette()
+    cib.dataset = str(tmp_path)
+    exp = exposure.Exposure()
+    exp.exp_time = 0.1
+    exp.exp_label = 7
+    exp.exp_datatype = datatype
+    cib.exposure = exp
+    written = []
+    cib.writefits = lambda data, header=None, frameid=None, date=None: written.append(frameid)
+    camera = FakeCCD()
+    cib.sequence(camera, 2)
+    assert camera.exptypes == [frametype]
+    assert written == ['7_1', '7_2']
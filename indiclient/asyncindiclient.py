@@ -0,0 +1,451 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+An asyncio INDI client, http://www.indilib.org.
+
+It uses the same object model (L{indivector}, L{indielement}, ...) and the same expat handlers as
+L{bigindiclient}, but the data is received by the event loop instead of a background thread. Any number
+of devices on any number of servers can be driven from one event loop, without polling:
+
+    async def main():
+        async with asyncindiclient("localhost", 7624) as client:
+            vector = await client.set_and_send_float("Telescope Simulator", "EQUATORIAL_EOD_COORD", "RA", 5.5)
+            await vector.wait_for_ok()
+            async for vector in client.updates("Telescope Simulator", "EQUATORIAL_EOD_COORD"):
+                print(vector.get_element("RA").get_float())
+"""
+
+import asyncio
+
+import logging
+import logging.handlers
+
+from .indiclient import _indiparser, inditransfertypes
+from .indiclient import inditextvector, indiswitchvector, indinumbervector, indiblobvector, indilightvector
+
+log = logging.getLogger("")
+log.setLevel(logging.INFO)
+
+
+class _pulse:
+    """
+    An asyncio event that re-arms itself each time it is fired, so that it can be waited for over and over again.
+    """
+
+    def __init__(self):
+        self._event = None
+
+    def fire(self):
+        """
+        Wakes up all the coroutines currently waiting.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout):
+        """
+        @param timeout: asyncio.TimeoutError is raised if the pulse was not fired within timeout seconds
+        @type timeout: FloatType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if self._event is None:
+            self._event = asyncio.Event()
+        await asyncio.wait_for(self._event.wait(), timeout)
+
+
+class _asyncindivector:
+    """
+    Turns L{indivector.wait_for_ok} and L{indivector.wait_for_ok_timeout} into coroutines that are woken up
+    as soon as the state of the vector is received.
+    @ivar _pulse : Fired each time the L{indilight} of the vector changes
+    @type _pulse : L{_pulse}
+    """
+
+    def __init__(self, attrs, tag):
+        super().__init__(attrs, tag)
+        self._pulse = _pulse()
+
+    def _set_light(self, light):
+        self._light = light
+        self._updates = self._updates + 1
+        self._pulse.fire()
+
+    def _set_state(self, state):
+        self._light._set_value("Alert")
+        self._light._set_value(state)
+        self._updates = self._updates + 1
+        self._pulse.fire()
+
+    async def _wait_for_ok_general(self, timeout):
+        loop = asyncio.get_running_loop()
+        t = loop.time()
+        while not(self._light.is_ok()):
+            remaining = timeout - (loop.time() - t)
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await self._pulse.wait(remaining)
+            except asyncio.TimeoutError:
+                raise Exception("timeout waiting for state to turn Ok " +
+                                "devicename=" + self.device + " vectorname= " + self.name +
+                                " " + str(timeout) + " " + str(loop.time() - t))
+
+
+class asyncinditextvector(_asyncindivector, inditextvector):
+    """A vector of texts, with awaitable waits"""
+
+
+class asyncindiswitchvector(_asyncindivector, indiswitchvector):
+    """A vector of switches, with awaitable waits"""
+
+
+class asyncindinumbervector(_asyncindivector, indinumbervector):
+    """A vector of numbers, with awaitable waits"""
+
+
+class asyncindiblobvector(_asyncindivector, indiblobvector):
+    """A vector of BLOBs, with awaitable waits"""
+
+
+class asyncindilightvector(_asyncindivector, indilightvector):
+    """A vector of lights, with awaitable waits"""
+
+
+class asyncindiclient(_indiparser):
+    """
+    An INDI client running on an asyncio event loop.
+    @ivar host  : The hostname of the INDI server
+    @type host  : StringType
+    @ivar port : The port address of the INDI server
+    @type port : IntType
+    @ivar reader : The stream the data of the server is read from
+    @type reader : asyncio.StreamReader
+    @ivar writer : The stream the data to the server is written to
+    @type writer : asyncio.StreamWriter
+    @ivar timeout : The time L{get_vector} waits for a vector that has not been received yet
+    @type timeout : FloatType
+    @ivar message_handler : Called with each INDI message received (see L{_default_message_handler})
+    @type message_handler : function
+    @ivar timeout_handler : Called when L{get_vector} times out (see L{_default_timeout_handler})
+    @type timeout_handler : function
+    @ivar _arrived : Fired each time a vector has been received
+    @type _arrived : L{_pulse}
+    @ivar _subscribers : The C{(devicename, vectorname, asyncio.Queue)} entries fed by L{updates}
+    @type _subscribers : list
+    @ivar _receivetask : The task running L{_receiver}
+    @type _receivetask : asyncio.Task
+    """
+
+    def __init__(self, host, port):
+        """
+        @param host:  The hostname or IP address of the server you want to connect to
+        @type host: StringType
+        @param port:  The port address of the server you want to connect to.
+        @type port: IntType
+        """
+        _indiparser.__init__(self)
+        self._factory.vectorclasses = [asyncinditextvector, asyncindiswitchvector, asyncindinumbervector,
+                                       asyncindiblobvector, asyncindilightvector]
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.timeout = 1
+        self.message_handler = self._default_message_handler
+        self.timeout_handler = self._default_timeout_handler
+        self._arrived = _pulse()
+        self._subscribers = []
+        self._receivetask = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.quit()
+
+    async def connect(self):
+        """
+        Opens the connection to the server, asks for its properties and starts receiving.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        await self._send("<getProperties version='1.5'/>")
+        self._receivetask = asyncio.ensure_future(self._receiver())
+
+    async def quit(self):
+        """
+        Stops receiving and closes the connection to the server.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if self._receivetask is not None:
+            self._receivetask.cancel()
+            try:
+                await self._receivetask
+            except asyncio.CancelledError:
+                pass
+            self._receivetask = None
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+    async def _receiver(self):
+        """
+        The task feeding the data received from the server into the parser.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        try:
+            while True:
+                data = await self.reader.read(1000000)
+                if not data:
+                    log.warning("Connection closed by host: %s" % self.host)
+                    break
+                self.expat.Parse(data, 0)
+        finally:
+            self._close_parser()
+            for devicename, vectorname, updates in self._subscribers:
+                updates.put_nowait(None)
+
+    async def _send(self, data):
+        self.writer.write(data.encode("utf8"))
+        await self.writer.drain()
+
+    def _vector_parsed(self, vector):
+        """
+        Merges a vector received into L{indivectors} and wakes up the coroutines waiting for it.
+        @param vector: The vector received
+        @type vector: L{indivector}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        stored = self._get_vector(vector.device, vector.name)
+        if stored is None:
+            self.indivectors.append(vector)
+            stored = vector
+        else:
+            stored.updateByVector(vector)
+        self._vector_updated(stored)
+
+    def _vector_updated(self, vector):
+        """
+        Hands a stored vector that has just changed to the L{updates} iterators and wakes up the coroutines waiting for it.
+        @param vector: The vector stored in L{indivectors}
+        @type vector: L{indivector}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        for devicename, vectorname, updates in self._subscribers:
+            if devicename in (None, vector.device) and vectorname in (None, vector.name):
+                updates.put_nowait(vector)
+        self._arrived.fire()
+
+    def _message_parsed(self, message):
+        self.message_handler(message, self)
+
+    def _default_message_handler(self, message, indi):
+        """
+        Called whenever an INDI message has been received from the server.
+        @param message: The indimessage received
+        @type message: L{indimessage}
+        @param indi : This parameter will be equal to self.
+        @type indi : L{asyncindiclient}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        log.info("Got message by host: %s : " % indi.host)
+        message.tell()
+
+    def _default_timeout_handler(self, devicename, vectorname, indi):
+        """
+        Called whenever a vector has been requested but was not received within L{timeout}.
+        @param devicename:  The name of the device
+        @type devicename: StringType
+        @param vectorname: The name of the Indivector
+        @type vectorname: StringType
+        @param indi : This parameter will be equal to self.
+        @type indi : L{asyncindiclient}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        log.warning("Timeout: %s %s" % (devicename, vectorname))
+
+    async def get_vector(self, devicename, vectorname):
+        """
+        Returns an L{indivector} matching the given L{devicename} and L{vectorname}, waiting up to L{timeout}
+        seconds for it to be received.
+        @param devicename:  The name of the device
+        @type devicename: StringType
+        @param vectorname:  The name of the vector
+        @type vectorname: StringType
+        @return: The L{indivector} found, B{None} on timeout
+        @rtype: L{indivector}
+        """
+        loop = asyncio.get_running_loop()
+        t = loop.time()
+        while True:
+            v = self._get_vector(devicename, vectorname)
+            if v is not None:
+                return v
+            remaining = self.timeout - (loop.time() - t)
+            if remaining <= 0:
+                self.timeout_handler(devicename, vectorname, self)
+                return None
+            try:
+                await self._arrived.wait(remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def get_element(self, devicename, vectorname, elementname):
+        """
+        @param devicename:  The name of the device
+        @type devicename: StringType
+        @param vectorname:  The name of the vector
+        @type vectorname: StringType
+        @param elementname:  The name of the element
+        @type elementname: StringType
+        @return: The element found
+        @rtype: L{indielement}
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        return vector.get_element(elementname)
+
+    async def updates(self, devicename=None, vectorname=None):
+        """
+        Asynchronous iterator over the vectors received from the server. It ends when the connection is closed.
+        The vector yielded is the one stored in L{indivectors}, so it always holds the latest values.
+        @param devicename:  The name of the device, B{None} for any device
+        @type devicename: StringType
+        @param vectorname:  The name of the vector, B{None} for any vector
+        @type vectorname: StringType
+        @return: The vectors, as they are received
+        @rtype: L{indivector}
+        """
+        entry = (devicename, vectorname, asyncio.Queue())
+        self._subscribers.append(entry)
+        try:
+            while True:
+                vector = await entry[2].get()
+                if vector is None:
+                    return
+                yield vector
+        finally:
+            self._subscribers.remove(entry)
+
+    async def send_vector(self, vector):
+        """
+        Sends an INDI vector to the INDI server.
+        @param vector:  The INDI vector to be send
+        @type vector: indivector
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if not vector.tag.is_vector():
+            return
+        # set before sending, the answer of the server may be parsed while draining
+        vector._light._set_value("Busy")
+        await self._send(vector.get_xml(inditransfertypes.inew))
+
+    async def enable_blob(self):
+        """
+        Tells the server that this client wants to receive L{indiblob} objects.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        await self._send("<enableBLOB>Also</enableBLOB>\n")
+
+    async def set_and_send_text(self, devicename, vectorname, elementname, text):
+        """
+        Sets the value of an element by a text, and sends it to the server
+        @return: The vector containing the element that was just sent.
+        @rtype: L{indivector}
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        if vector is not None:
+            vector.get_element(elementname).set_text(text)
+            await self.send_vector(vector)
+        return vector
+
+    async def set_and_send_bool(self, devicename, vectorname, elementname, state):
+        """
+        Sets the value of of an indi element by a boolean, and sends it to the server
+        @return: The vector containing the element that was just sent.
+        @rtype: L{indivector}
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        if vector is not None:
+            vector.get_element(elementname).set_active(state)
+            await self.send_vector(vector)
+        return vector
+
+    async def set_and_send_float(self, devicename, vectorname, elementname, number):
+        """
+        Sets the value of an indi element by a floating point number, and sends it to the server
+        @return: The vector containing the element that was just sent.
+        @rtype: L{indivector}
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        if vector is not None:
+            vector.get_element(elementname).set_float(number)
+            await self.send_vector(vector)
+        return vector
+
+    async def set_and_send_switchvector_by_elementlabel(self, devicename, vectorname, elementlabel):
+        """
+        Sets all L{indiswitch} elements in this vector to C{Off}. And sets the one matching the given L{elementlabel}
+        to C{On}
+        @return: The vector that that was just sent.
+        @rtype: L{indivector}
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        if vector is not None:
+            vector.set_by_elementlabel(elementlabel)
+            await self.send_vector(vector)
+        return vector
+
+    async def get_float(self, devicename, vectorname, elementname):
+        """
+        @return: the value of the element, which must be an L{indinumber}
+        @rtype: FloatType
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        try:
+            num = vector.get_element(elementname).get_float()
+        except Exception as e:
+            log.error("Can't get float from bogus vector: %s" % e)
+            num = None
+        return num
+
+    async def get_text(self, devicename, vectorname, elementname):
+        """
+        @return: the value of the element
+        @rtype: StringType
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        try:
+            text = vector.get_element(elementname).get_text()
+        except Exception as e:
+            log.error("Can't get text from bogus vector: %s" % e)
+            text = None
+        return text
+
+    async def get_bool(self, devicename, vectorname, elementname):
+        """
+        @return: the value of the element, which must be an L{indiswitch}
+        @rtype: BooleanType
+        """
+        vector = await self.get_vector(devicename, vectorname)
+        try:
+            bol = vector.get_element(elementname).get_active()
+        except Exception as e:
+            log.error("Can't get bool from bogus vector: %s" % e)
+            bol = None
+        return bol
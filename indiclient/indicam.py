@@ -6,14 +6,19 @@ Classes and utility functions for communicating with cameras via the INDI protoc
 """
 
 import time
-import io
+import threading
 
 import logging
 import logging.handlers
 
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
 from astropy.io import fits
 
 from .indiclient import indiclient
+from .indistream import FrameRing
 from astropy.table import Table
 
 log = logging.getLogger("")
@@ -26,8 +31,13 @@ class CCDCam(indiclient):
     exposures, configuring camera binning, etc.
     """
     def __init__(self, host, port, driver="CCD Simulator", debug=True):
-        super(CCDCam, self).__init__(host, port)
+        super(CCDCam, self).__init__(host, port, devicename=driver)
         self.camera_name = "UT1 Default"
+        # seconds allowed for readout and download, on top of the exposure time
+        self.download_timeout = 10.0
+        self._exposure = None
+        self._stream = None
+        self._ccd_info = None
         self.enable_blob()
         self.driver = driver
         self.debug = debug
@@ -37,19 +47,21 @@ class CCDCam(indiclient):
 
         # run this to clear any queued events
         self.process_events()
-        self.defvectorlist = []
-        self.vector_dict = {v.name: v for v in self.indivectors.list}
+        self.defvectors.clear()
+        self.vector_dict = {v.name: v for v in self.indivectors.list if v.device == self.driver}
 
     @property
     def ccd_info(self):
         """
-        Get the CCD info about pixel sizes and bits per pixel, etc.
+        Get the CCD info about pixel sizes and bits per pixel, etc. Read once, until the camera is connected again.
         """
-        info_vec = self.get_vector(self.driver, "CCD_INFO")
-        info = {}
-        for e in info_vec.elements:
-            info[e.getName()] = e.get_float()
-        return info
+        if self._ccd_info is None:
+            info_vec = self.get_vector(self.driver, "CCD_INFO")
+            info = {}
+            for e in info_vec.elements:
+                info[e.getName()] = e.get_float()
+            self._ccd_info = info
+        return self._ccd_info
 
     @property
     def connected(self):
@@ -140,6 +152,39 @@ class CCDCam(indiclient):
             if f in self.filters:
                 self.set_and_send_float(self.driver, "FILTER_SLOT", "FILTER_SLOT_VALUE", self.filters.index(f)+1)
 
+    @property
+    def compression(self):
+        """
+        Return True if the driver compresses the images it sends (.fits.z), they are decompressed
+        by the pool of the connection while they are received.
+        """
+        vec = self.get_vector(self.driver, "CCD_COMPRESSION")
+        if vec is None:
+            return False
+        for name in ("INDI_ENABLED", "CCD_COMPRESS"):
+            e = vec.get_element(name)
+            if e is not None:
+                return e.get_active()
+        return False
+
+    @compression.setter
+    def compression(self, on):
+        """
+        Ask the driver to compress the images it sends or not, worth it on a slow link between the camera and the client
+        """
+        vec = self.get_vector(self.driver, "CCD_COMPRESSION")
+        if vec is None:
+            log.warning("%s does not support compression." % self.driver)
+            return
+        # INDI 1.8 renamed CCD_COMPRESS/CCD_RAW
+        for enabled, disabled in (("INDI_ENABLED", "INDI_DISABLED"), ("CCD_COMPRESS", "CCD_RAW")):
+            if vec.get_element(enabled) is not None and vec.get_element(disabled) is not None:
+                vec.get_element(enabled).set_active(on)
+                vec.get_element(disabled).set_active(not on)
+                self.send_vector(vec)
+                log.info("Setting compression %s" % ("on" if on else "off"))
+                return
+
     @property
     def binning(self):
         """
@@ -157,15 +202,17 @@ class CCDCam(indiclient):
         """
         Set binning from a dict of form of e.g. {'X':2, 'Y':2}
         """
-        if 'X' in bindict:
-            if bindict['X'] >= 1:
-                self.set_and_send_float(self.driver, "CCD_BINNING", "HOR_BIN", int(bindict['X']))
-                log.info("Setting X binning to %d" % int(bindict['X']))
+        # HOR_BIN and VER_BIN are sent as one newNumberVector
+        with self.batch():
+            if 'X' in bindict:
+                if bindict['X'] >= 1:
+                    self.set_and_send_float(self.driver, "CCD_BINNING", "HOR_BIN", int(bindict['X']))
+                    log.info("Setting X binning to %d" % int(bindict['X']))
 
-        if 'Y' in bindict:
-            if bindict['Y'] >= 1:
-                self.set_and_send_float(self.driver, "CCD_BINNING", "VER_BIN", int(bindict['Y']))
-                log.info("Setting Y binning to %d" % int(bindict['Y']))
+            if 'Y' in bindict:
+                if bindict['Y'] >= 1:
+                    self.set_and_send_float(self.driver, "CCD_BINNING", "VER_BIN", int(bindict['Y']))
+                    log.info("Setting Y binning to %d" % int(bindict['Y']))
 
     @property
     def frame(self):
@@ -196,24 +243,26 @@ class CCDCam(indiclient):
         }
         """
         ccdinfo = self.ccd_info
-        if 'X' in framedict:
-            if framedict['X'] >= 0 and framedict['X'] <= ccdinfo['CCD_MAX_X']:
-                self.set_and_send_float(self.driver, "CCD_FRAME", "X", int(framedict['X']))
-                log.info("Setting lower X to %d" % int(framedict['X']))
-                if 'width' in framedict:
-                    newwidth = min(framedict['width'], ccdinfo['CCD_MAX_X']-framedict['X'])
-                    if newwidth >= 1:
-                        self.set_and_send_float(self.driver, "CCD_FRAME", "WIDTH", int(newwidth))
-                        log.info("Setting width to %d" % int(newwidth))
-        if 'Y' in framedict:
-            if framedict['Y'] >= 0 and framedict['Y'] <= ccdinfo['CCD_MAX_Y']:
-                self.set_and_send_float(self.driver, "CCD_FRAME", "Y", int(framedict['Y']))
-                log.info("Setting lower Y to %d" % int(framedict['Y']))
-                if 'height' in framedict:
-                    newheight = min(framedict['height'], ccdinfo['CCD_MAX_Y']-framedict['Y'])
-                    if newheight >= 1:
-                        self.set_and_send_float(self.driver, "CCD_FRAME", "HEIGHT", int(newheight))
-                        log.info("Setting height to %d" % int(newheight))
+        # all the CCD_FRAME elements are sent as one newNumberVector
+        with self.batch():
+            if 'X' in framedict:
+                if framedict['X'] >= 0 and framedict['X'] <= ccdinfo['CCD_MAX_X']:
+                    self.set_and_send_float(self.driver, "CCD_FRAME", "X", int(framedict['X']))
+                    log.info("Setting lower X to %d" % int(framedict['X']))
+                    if 'width' in framedict:
+                        newwidth = min(framedict['width'], ccdinfo['CCD_MAX_X']-framedict['X'])
+                        if newwidth >= 1:
+                            self.set_and_send_float(self.driver, "CCD_FRAME", "WIDTH", int(newwidth))
+                            log.info("Setting width to %d" % int(newwidth))
+            if 'Y' in framedict:
+                if framedict['Y'] >= 0 and framedict['Y'] <= ccdinfo['CCD_MAX_Y']:
+                    self.set_and_send_float(self.driver, "CCD_FRAME", "Y", int(framedict['Y']))
+                    log.info("Setting lower Y to %d" % int(framedict['Y']))
+                    if 'height' in framedict:
+                        newheight = min(framedict['height'], ccdinfo['CCD_MAX_Y']-framedict['Y'])
+                        if newheight >= 1:
+                            self.set_and_send_float(self.driver, "CCD_FRAME", "HEIGHT", int(newheight))
+                            log.info("Setting height to %d" % int(newheight))
 
     def connect(self):
         """
@@ -223,6 +272,8 @@ class CCDCam(indiclient):
         if self.debug and vec is not None:
             vec.tell()
         self.process_events()
+        # the sensor geometry is only known for sure once connected
+        self._ccd_info = None
         return vec
 
     def disconnect(self):
@@ -258,9 +309,16 @@ class CCDCam(indiclient):
         self.process_events()
         return c_vec
 
-    def expose(self, exptime=1.0, exptype="Light", latency=1):
+    def _start_exposure(self, exptime, exptype):
+        """
+        Set the frame type and start an exposure, without waiting for it
+        """
+        self._set_frame_type(exptime, exptype)
+        self._send_exposure(exptime)
+
+    def _set_frame_type(self, exptime, exptype):
         """
-        Take exposure and return FITS data
+        Check the exposure parameters and set the frame type
         """
         if exptype not in self.frame_types:
             raise Exception("Invalid exposure type, %s. Must be one of %s'." % (exptype, repr(self.frame_types)))
@@ -272,57 +330,232 @@ class CCDCam(indiclient):
         if self.debug:
             ft_vec.tell()
 
+    def _send_exposure(self, exptime):
+        """
+        Start an exposure with the frame type already set
+        """
+        # remember which BLOB was the last one, the image is the next one received
+        blob_vec = self.get_vector(self.driver, "CCD1")
+        self._exposure = {
+            'blob': blob_vec,
+            'count': blob_vec.get_update_count(),
+            'exptime': exptime,
+            'fits': None
+        }
+
         exp_vec = self.set_and_send_float(self.driver, "CCD_EXPOSURE", "CCD_EXPOSURE_VALUE", exptime)
         if self.debug:
             exp_vec.tell()
 
-        self.defvectorlist = []
-        fitsdata = None
-        run = True
-
+    def _wait_exposure(self, timeout):
+        """
+        Wait until the image of the current exposure has been received. Woken up by the receiving thread
+        as soon as the BLOB arrives, gives up early if the driver flags CCD_EXPOSURE with an Alert.
+        """
+        exposure = self._exposure
+        exp_vec = self.get_vector(self.driver, "CCD_EXPOSURE")
         t = time.time()
-        timeout = exptime * latency
-        while run:
-            self.process_receive_vector_queue()
-            while self.receive_event_queue.empty() is False:               
-                vector = self.receive_event_queue.get()
-                if vector.tag.get_type() == "BLOBVector":
-                    log.info("Reading FITS image out...")
-                    blob = vector.get_first_element()
-                    if blob.get_plain_format() == ".fits":
-                        buf = io.BytesIO(blob.get_data())
-                        fitsdata = fits.open(buf)
-                        if 'FILTER' not in fitsdata[0].header:
-                            fitsdata[0].header['FILTER'] = self.filter
-                        fitsdata[0].header['CAMERA'] = self.camera_name
-                    run = False
-                    break
-                if vector.tag.get_type() == "message":
-                    msg = vector.get_text()
-                    if "ERROR" in msg:
-                        log.error(msg)
-                    else:
-                        log.info(msg)
-            if ((time.time() - t) > timeout):
+        while True:
+            remaining = timeout - (time.time() - t)
+            if remaining <= 0:
                 log.warning("Exposure timed out.")
-                break
-            time.sleep(1)
-   
+                return False
+            if exposure['blob'].wait_for_update(exposure['count'], min(remaining, 0.5)):
+                return True
+            if exp_vec.get_light().is_alert():
+                log.error("Exposure failed, CCD_EXPOSURE is in Alert state.")
+                return False
+
+    def _read_image(self):
+        """
+        Return the FITS data of the current exposure, decoded once from the BLOB received
+        """
+        exposure = self._exposure
+        if exposure['fits'] is None:
+            log.info("Reading FITS image out...")
+            blob = exposure['blob'].get_first_element()
+            if blob.get_plain_format() == ".fits":
+                exposure['fits'] = self._decode_image(blob.get_data(), self._filter_name)
+        return exposure['fits']
+
+    def _filter_name(self):
+        """
+        Return the name of the current filter, None if the camera has no filter wheel
+        """
+        if "FILTER_SLOT" not in self.vector_dict or "FILTER_NAME" not in self.vector_dict:
+            return None
+        return self.filter
+
+    def _decode_image(self, data, filter_name=None):
+        """
+        Return the FITS data of an image received, with the FILTER and CAMERA keywords added
+        filter_name is a function returning the name of the filter, only called if the image has no FILTER keyword,
+        which is left out if it returns None
+        """
+        # fromstring does not copy again, the image data is a view on these bytes
+        fitsdata = fits.HDUList.fromstring(bytes(data))
+        if 'FILTER' not in fitsdata[0].header and filter_name is not None:
+            name = filter_name()
+            if name is not None:
+                fitsdata[0].header['FILTER'] = name
+        fitsdata[0].header['CAMERA'] = self.camera_name
         return fitsdata
-    
+
+    def expose(self, exptime=1.0, exptype="Light", latency=1):
+        """
+        Take exposure and return FITS data, as soon as the image has been received.
+        Gives up after exptime * latency + download_timeout seconds.
+        """
+        self._start_exposure(exptime, exptype)
+        self.defvectors.clear()
+        ready = self._wait_exposure(exptime * latency + self.download_timeout)
+        # hand the messages and updates received meanwhile to their handlers
+        self.process_events()
+        if not ready:
+            return None
+        return self._read_image()
+
+    def sequence(self, count, exptime=1.0, exptype="Light", filter=None, callback=None, workers=2, queued=2,
+                 latency=1):
+        """
+        Take a sequence of count exposures and return the FITS data of each one, in order.
+        The next exposure is started as soon as the image of the previous one has been received,
+        the images are decoded and handed to callback(index, fitsdata) by a pool of workers meanwhile.
+        At most queued images wait for a worker, the sequence waits before starting the next exposure
+        when the workers fall behind. Frames that were not received, or whose callback failed, are None.
+        """
+        if filter is not None:
+            self.filter = filter
+        self._set_frame_type(exptime, exptype)
+        # looked up by the first image without a FILTER keyword, if any
+        names = []
+
+        def filter_name():
+            if len(names) == 0:
+                names.append(self._filter_name())
+            return names[0]
+
+        def process(index, data):
+            try:
+                fitsdata = self._decode_image(data, filter_name)
+                if callback is not None:
+                    callback(index, fitsdata)
+                return fitsdata
+            except Exception:
+                log.exception("Processing frame %d of the sequence failed." % index)
+                return None
+            finally:
+                pending.release()
+
+        pending = threading.BoundedSemaphore(workers + queued)
+        frames = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for index in range(count):
+                pending.acquire()
+                self._send_exposure(exptime)
+                ready = self._wait_exposure(exptime * latency + self.download_timeout)
+                self.process_events()
+                if not ready:
+                    pending.release()
+                    break
+                # each BLOB is decoded into a buffer of its own, the next exposure does not overwrite it
+                blob = self._exposure['blob'].get_first_element()
+                if blob.get_plain_format() != ".fits":
+                    pending.release()
+                    frames.append(None)
+                    continue
+                frames.append(pool.submit(process, index, blob.get_data()))
+        frames = [f if f is None else f.result() for f in frames]
+        return frames + [None] * (count - len(frames))
+
+    def _send_changed(self, vectorname, values):
+        """
+        Set the number elements whose value differs from the one given, they are sent by the batch around
+        """
+        vec = self.get_vector(self.driver, vectorname)
+        for name, value in values.items():
+            if vec.get_element(name).get_float() != value:
+                self.set_and_send_float(self.driver, vectorname, name, value)
+
+    def set_roi(self, roi, binning=None):
+        """
+        Set the readout region, a dict like frame, and the binning in one write. Only the values that changed are sent,
+        so switching between a region and the full frame costs a single round trip.
+        """
+        ccdinfo = self.ccd_info
+        x = min(max(int(roi.get('X', 0)), 0), int(ccdinfo['CCD_MAX_X']))
+        y = min(max(int(roi.get('Y', 0)), 0), int(ccdinfo['CCD_MAX_Y']))
+        width = min(int(roi.get('width', ccdinfo['CCD_MAX_X'])), int(ccdinfo['CCD_MAX_X']) - x)
+        height = min(int(roi.get('height', ccdinfo['CCD_MAX_Y'])), int(ccdinfo['CCD_MAX_Y']) - y)
+        with self.batch():
+            if binning is not None:
+                self._send_changed("CCD_BINNING", {"HOR_BIN": int(binning), "VER_BIN": int(binning)})
+            self._send_changed("CCD_FRAME", {"X": x, "Y": y, "WIDTH": width, "HEIGHT": height})
+        return {'X': x, 'Y': y, 'width': width, 'height': height}
+
+    def full_frame(self, binning=None):
+        """
+        Set the readout region back to the whole sensor
+        """
+        return self.set_roi({}, binning)
+
+    def _cutout(self, data, roi, binning):
+        """
+        Return the image of a BLOB as a numpy array, cut to the region if the driver sent the whole sensor
+        """
+        image = fits.HDUList.fromstring(bytes(data))[0].data
+        ccdinfo = self.ccd_info
+        full = (int(ccdinfo['CCD_MAX_Y']) // binning, int(ccdinfo['CCD_MAX_X']) // binning)
+        if image is not None and image.shape[-2:] == full and full != (roi['height'] // binning, roi['width'] // binning):
+            image = image[..., roi['Y'] // binning:(roi['Y'] + roi['height']) // binning,
+                          roi['X'] // binning:(roi['X'] + roi['width']) // binning]
+        return image
+
+    def focus_loop(self, exptime, roi=None, binning=None, count=None, latency=1):
+        """
+        Take repeated exposures of a region of the sensor, for focusing, and yield each image as a numpy array.
+        The region and binning are set once, the next exposure is started as soon as an image has been received,
+        before it is decoded. Runs until count images have been taken, forever if None, or the loop is left.
+        """
+        current = {k: int(v) for k, v in self.frame.items()}
+        if roi is not None or binning is not None:
+            roi = self.set_roi(roi if roi is not None else current, binning)
+        else:
+            roi = current
+        binning = int(binning if binning is not None else self.binning.get('X', 1))
+        self._set_frame_type(exptime, "Light")
+        self._send_exposure(exptime)
+        taken = 0
+        pending = True
+        try:
+            while count is None or taken < count:
+                if not self._wait_exposure(exptime * latency + self.download_timeout):
+                    return
+                data = self._exposure['blob'].get_first_element().get_data()
+                taken += 1
+                pending = count is None or taken < count
+                if pending:
+                    self._send_exposure(exptime)
+                self.process_events()
+                yield self._cutout(data, roi, binning)
+        finally:
+            if pending:
+                # do not leave an image for the next exposure to pick up
+                self.set_and_send_bool(self.driver, "CCD_ABORT_EXPOSURE", "ABORT", True)
+
     def startexposure(self, exptime: float, Light: bool):
         """
         Start an exposure (Alpaca compatibility)      
         Notes:
-            Use ImageReady to check when the exposure is complete.
+            Returns immediately, use ImageReady to check when the exposure is complete.
             Duration (float): Duration of exposure in seconds.
             Light (bool): True if light frame, false if dark frame.
         """
         if Light:
             exptype = "Light"
         else:
-            exptype = "Black"
-        self.expose(exptime,exptype)
+            exptype = "Dark"
+        self._start_exposure(exptime, exptype)
 
     def abortexposure(self):
         """
@@ -345,12 +578,146 @@ class CCDCam(indiclient):
     def imageready(self):
         """
         Indicate that an image is ready to be downloaded. (Alpaca compatibility)
+        Does not block, the image of the exposure started by startexposure is ready once its BLOB has been received.
         """
+        if self._exposure is not None:
+            return self._exposure['blob'].get_update_count() != self._exposure['count']
         if self.get_float(self.driver, "CCD_EXPOSURE", "CCD_EXPOSURE_VALUE") <= 0:
             return True
         else:
             return False
 
+    def imagearray(self):
+        """
+        Return the image of the last exposure as a numpy array, None if it is not ready yet. (Alpaca compatibility)
+        """
+        if self._exposure is None or not self.imageready():
+            return None
+        fitsdata = self._read_image()
+        if fitsdata is None:
+            return None
+        return fitsdata[0].data
+
+    def start_stream(self, frames=32, exptime=None, callback=None, spool=None):
+        """
+        Start the video stream of the camera (CCD_VIDEO_STREAM) and return the FrameRing the frames are received into.
+        The raw stream BLOBs are mapped straight onto numpy arrays, without FITS parsing. The last frames
+        are kept in the ring, the oldest one is dropped when it is full.
+        callback(index, timestamp, frame) is called by the stream thread for each frame, spool is an optional
+        SERWriter or FITSCubeWriter the frames are written to, it is closed by stop_stream.
+        """
+        if self._stream is not None:
+            self.stop_stream()
+        if exptime is not None:
+            self.set_and_send_float(self.driver, "STREAMING_EXPOSURE", "STREAMING_EXPOSURE_VALUE", exptime)
+        ring = FrameRing(frames)
+        blob_vec = self.get_vector(self.driver, "CCD1")
+        stop = threading.Event()
+        # the frames are the BLOBs received after this one
+        thread = threading.Thread(target=self._receive_stream,
+                                  args=(ring, blob_vec, blob_vec.get_update_count(), callback, spool, stop),
+                                  daemon=True)
+        self._stream = {'ring': ring, 'thread': thread, 'stop': stop}
+        thread.start()
+        self._set_stream(True)
+        return ring
+
+    def stop_stream(self):
+        """
+        Stop the video stream, return the FrameRing with the last frames received
+        """
+        if self._stream is None:
+            return None
+        stream = self._stream
+        self._stream = None
+        self._set_stream(False)
+        stream['stop'].set()
+        stream['thread'].join()
+        return stream['ring']
+
+    def _set_stream(self, on):
+        """
+        Switch the video stream on or off
+        """
+        vec = self.get_vector(self.driver, "CCD_VIDEO_STREAM")
+        vec.get_element("STREAM_ON").set_active(on)
+        vec.get_element("STREAM_OFF").set_active(not on)
+        self.send_vector(vec)
+
+    def _stream_shape(self):
+        """
+        Return the (height, width) of the streamed frames, binned
+        """
+        binning = self.binning
+        if "CCD_STREAM_FRAME" in self.vector_dict:
+            width = self.get_float(self.driver, "CCD_STREAM_FRAME", "WIDTH")
+            height = self.get_float(self.driver, "CCD_STREAM_FRAME", "HEIGHT")
+        else:
+            width = self.get_float(self.driver, "CCD_FRAME", "WIDTH")
+            height = self.get_float(self.driver, "CCD_FRAME", "HEIGHT")
+        return int(height) // binning.get('Y', 1), int(width) // binning.get('X', 1)
+
+    def _stream_frame(self, data, shape):
+        """
+        Map a raw stream BLOB onto a numpy array, 8 or 16 bit, mono or RGB. Return None if its size does not match
+        """
+        height, width = shape
+        pixels = height * width
+        if pixels == 0 or len(data) % pixels != 0:
+            return None
+        depth = len(data) // pixels
+        if depth == 1 or depth == 3:
+            dtype = np.uint8
+        elif depth == 2 or depth == 6:
+            dtype = np.dtype('<u2')
+        else:
+            return None
+        if depth > 2:
+            shape = (height, width, 3)
+        return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+    def _receive_stream(self, ring, blob_vec, count, callback, spool, stop):
+        """
+        Stream thread, woken up by the receiving thread each time a BLOB has been stored
+        """
+        received = self.connection._received
+        shape = self._stream_shape()
+        try:
+            while not stop.is_set():
+                with received:
+                    if not received.wait_for(lambda: blob_vec.get_update_count() != count, 0.5):
+                        continue
+                    # the count and the data are read together, the receiving thread holds this lock to store BLOBs
+                    updates = blob_vec.get_update_count()
+                    blob = blob_vec.get_first_element()
+                    data = blob.get_data()
+                    stream = blob.get_plain_format() == ".stream"
+                ring.dropped += updates - count - 1
+                count = updates
+                if not stream:
+                    continue
+                frame = self._stream_frame(data, shape)
+                if frame is None:
+                    # the frame or binning changed
+                    shape = self._stream_shape()
+                    frame = self._stream_frame(data, shape)
+                    if frame is None:
+                        log.warning("Dropping a stream frame of %d bytes, it does not match %s." % (len(data), shape))
+                        ring.dropped += 1
+                        continue
+                timestamp = time.time()
+                index = ring.put(frame, timestamp)
+                if spool is not None:
+                    spool.write(frame, timestamp)
+                if callback is not None:
+                    callback(index, timestamp, frame)
+        except Exception:
+            log.exception("Stream stopped.")
+        finally:
+            if spool is not None:
+                spool.close()
+            ring.close()
+
     @property
     def activedevices(self):
         """
@@ -29,13 +29,17 @@ An INDI Client Library
 import socket
 import xml.parsers.expat
 import base64
+import binascii
 import sys
 import os
 import threading
+import contextlib
 import queue
 import math
+import random
 import zlib
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
@@ -45,15 +49,19 @@ log = logging.getLogger("")
 log.setLevel(logging.INFO)
 
 
-class _indinameconventions:
+class _indinameconventions(object):
     """
     The INDI naming scheme.
-    @ivar basenames : The possible "Basenames" of an L{indiobject} ["Text","Switch","Number","BLOB","Light"]
+    @cvar basenames : The possible "Basenames" of an L{indiobject} ["Text","Switch","Number","BLOB","Light"]
     @type basenames : list of StringType
     """
 
+    __slots__ = ()
+
+    basenames = ["Text", "Switch", "Number", "BLOB", "Light"]
+
     def __init__(self):
-        self.basenames = ["Text", "Switch", "Number", "BLOB", "Light"]
+        pass
 
     def _get_defelementtag(self, basename):
         """
@@ -139,11 +147,14 @@ class _indinameconventions:
 
 class _inditagfactory(_indinameconventions):
     """
-    A Class to create an L{indixmltag} from its XML representation
+    A Class to create an L{indixmltag} from its XML representation. Tags are immutable, so there is exactly
+    one L{indixmltag} per XML tag name, shared by all the objects carrying it (see L{_inditags}).
     @ivar dict : a dictionary mapping XML representations to the corresponding L{indixmltag} objects
     @type dict : DictType
     """
 
+    __slots__ = ("dict",)
+
     def __init__(self):
         """
         Constructor
@@ -238,6 +249,8 @@ class indixmltag(_indinameconventions):
     @type _index : IntType
     """
 
+    __slots__ = ("_is_vector", "_is_element", "_is_message", "_transfertype", "_index", "_basename", "_initial_tag")
+
     def __init__(self, is_vector, is_element, is_message, index, transfertype):
         """
         @param is_vector : C{True} if the tag shall denote an L{indivector}, C{False} otherwise
@@ -347,6 +360,10 @@ class indixmltag(_indinameconventions):
             return self._get_message_tag()
 
 
+_inditags = _inditagfactory()
+"""The L{_inditagfactory} holding the L{indixmltag} of every XML tag name"""
+
+
 class _indiobjectfactory(_indinameconventions):
     """
     A Class to create L{indiobject}s from their XML attributes
@@ -356,12 +373,14 @@ class _indiobjectfactory(_indinameconventions):
     @type vectorclasses : a list of L{indivector}
     """
 
+    __slots__ = ("tagfactory", "elementclasses", "vectorclasses")
+
     def __init__(self):
         """
         Constructor
         """
         _indinameconventions.__init__(self)
-        self.tagfactory = _inditagfactory()
+        self.tagfactory = _inditags
         self.elementclasses = [inditext, indiswitch, indinumber, indiblob, indilight]
         self.vectorclasses = [inditextvector, indiswitchvector, indinumbervector, indiblobvector, indilightvector]
 
@@ -388,7 +407,7 @@ class _indiobjectfactory(_indinameconventions):
             return self.vectorclasses[i](attrs, inditag)
 
 
-class indipermissions:
+class indipermissions(object):
     """
     The indi read/write permissions.
     @ivar perm : The users read/write permissions for the  vector possible values are:
@@ -398,6 +417,8 @@ class indipermissions:
     @type perm : StringType
     """
 
+    __slots__ = ("perm",)
+
     def __init__(self, perm):
         """
         @param perm : The users read/write permissions for the  vector possible values are:
@@ -441,12 +462,14 @@ class indipermissions:
             return "read only"
 
 
-class indiobject:
+class indiobject(object):
     """ The Base Class for INDI objects (so anything that INDI can send or receive )
     @ivar tag: The XML tag of the INDI object (see L{indixmltag}).
     @type tag: L{indixmltag}
     """
 
+    __slots__ = ("tag",)
+
     def __init__(self, attrs, tag):
         """
         @param tag: The XML tag of the vector (see L{indixmltag}).
@@ -504,6 +527,8 @@ class indinamedobject(indiobject):
     @type label : StringType
     """
 
+    __slots__ = ("name", "label")
+
     def __init__(self, attrs, tag):
         """
         @param tag: The XML tag of the object (see L{indixmltag}).
@@ -534,6 +559,8 @@ class indielement(indinamedobject):
     @type _old_value : StringType
     """
 
+    __slots__ = ("_value", "_old_value")
+
     def __init__(self, attrs, tag):
         indinamedobject.__init__(self, attrs, tag)
         self._set_value('')
@@ -616,12 +643,23 @@ class indinumber(indielement):
     @type _max : StringType
     @ivar _step : The step increment of the number
     @type _step : StringType
+    @ivar _float : The value parsed by L{_set_value}, B{None} as long as no valid value has been set
+    @type _float : FloatType
+    @ivar _text : The formatted value returned by L{get_text}, B{None} until it is requested
+    @type _text : StringType
+    @ivar _sexagesimal : C{True} if L{format} requires sexagesimal display
+    @type _sexagesimal : BooleanType
     """
 
+    __slots__ = ("format", "_min", "_max", "_step", "_float", "_text", "_sexagesimal")
+
     def __init__(self, attrs, tag):
         self._value = ""
+        self._float = None
+        self._text = None
         indielement.__init__(self, attrs, tag)
         self.format = attrs.get('format', "").strip()
+        self._sexagesimal = (not (-1 == self.format.find("m")))
         self._min = attrs.get('min', "").strip()
         self._max = attrs.get('max', "").strip()
         self._step = attrs.get('step', "").strip()
@@ -675,16 +713,20 @@ class indinumber(indielement):
 
     def _set_value(self, value):
         try:
-            float(value)
+            number = float(value)
         except Exception:
             return
         indielement._set_value(self, value)
+        self._float = number
+        self._text = None
 
     def get_float(self):
         """
         @return: a float representation of it value
         @rtype: FloatType
         """
+        if self._float is not None:
+            return self._float
         success = False
         while success is False:
             success = True
@@ -733,17 +775,19 @@ class indinumber(indielement):
         @return: C{True} if the format property requires sexagesimal display
         @rtype: BooleanType
         """
-        return (not (-1 == self.format.find("m")))
+        return self._sexagesimal
 
     def get_text(self):
         """
         @return: a formated string representation of it value
         @rtype:  StringType
         """
-        if (-1 == self.format.find("m")):
-            return self.format % self.get_float()
-        else:
-            return _sexagesimal(self.format, self.get_float())
+        if self._text is None:
+            if self._sexagesimal:
+                self._text = _sexagesimal(self.format, self.get_float())
+            else:
+                self._text = self.format % self.get_float()
+        return self._text
 
     def set_text(self, text):
         """
@@ -781,6 +825,8 @@ class indinumber(indielement):
 class inditext(indielement):
     """a (nearly) arbitrary text"""
 
+    __slots__ = ()
+
 
 class indilight(indielement):
     """
@@ -793,6 +839,8 @@ class indilight(indielement):
     @type _value : StringType
     """
 
+    __slots__ = ()
+
     def __init__(self, attrs, tag):
         self._value = ""
         indielement.__init__(self, attrs, tag)
@@ -867,6 +915,8 @@ class indilight(indielement):
 class indiswitch(indielement):
     """a switch that can be either C{On} or C{Off}"""
 
+    __slots__ = ()
+
     def get_active(self):
         """
         @return: a Boolean representing the state of the switch:
@@ -894,15 +944,181 @@ class indiswitch(indielement):
             self._set_value("Off")
 
 
+class _indiblobdecoder(object):
+    """
+    Decodes the base64 character data of a BLOB while it is being received, straight into a buffer
+    preallocated from the C{size} attribute of the BLOB. Formats ending with C{.z} are decompressed on the fly.
+    Only a few kilobytes of encoded data are held at any time, instead of the whole encoded BLOB.
+    Given a pool, the decoding and decompression run on a worker of the pool, the receiving thread only
+    hands the character data over, without ever waiting for the worker.
+    @ivar buffer : The decoded data
+    @type buffer : bytearray
+    @ivar enclen : The number of base64 characters received so far
+    @type enclen : IntType
+    """
+
+    _whitespace = str.maketrans("", "", " \t\r\n")
+
+    def __init__(self, size, compressed, pool=None):
+        """
+        @param size: The expected size of the decoded data, the buffer grows if it turns out to be larger
+        @type size: IntType
+        @param compressed: C{True} if the data is zlib compressed
+        @type compressed: BooleanType
+        @param pool: The pool to decode the data in, B{None} to decode it in the calling thread
+        @type pool: concurrent.futures.Executor
+        """
+        self.buffer = bytearray(size)
+        self.enclen = 0
+        self._view = memoryview(self.buffer)
+        self._offset = 0
+        self._pending = ""
+        self._decompressor = zlib.decompressobj() if compressed else None
+        self._pool = pool
+        self._chunks = None
+        self._task = None
+
+    def _decode(self, chunk):
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._write(chunk)
+
+    def _write(self, chunk):
+        end = self._offset + len(chunk)
+        if end > len(self.buffer):
+            self._view.release()
+            self.buffer.extend(bytes(max(end - len(self.buffer), len(self.buffer))))
+            self._view = memoryview(self.buffer)
+        self._view[self._offset:end] = chunk
+        self._offset = end
+
+    def _run(self):
+        """
+        Decodes the character data queued by L{feed} until L{finish} queues B{None}, on a worker of the pool.
+        """
+        error = None
+        while True:
+            data = self._chunks.get()
+            if data is None:
+                break
+            # after an error the data is still drained, the receiving thread must never wait for a full queue
+            if error is None:
+                try:
+                    self._decode(binascii.a2b_base64(data))
+                except Exception as e:
+                    error = e
+        if error is not None:
+            raise error
+
+    def _submit(self, data):
+        if self._pool is None:
+            self._decode(binascii.a2b_base64(data))
+            return
+        if self._task is None:
+            # unbounded, a receiving thread (or event loop) blocked on a full queue could starve the worker
+            self._chunks = queue.SimpleQueue()
+            self._task = self._pool.submit(self._run)
+        self._chunks.put(data)
+
+    def feed(self, data):
+        """
+        Decodes a fragment of character data, as delivered by the XML parser.
+        @param data: base64 encoded data, may contain whitespace and be cut anywhere
+        @type data: StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        data = self._pending + data.translate(self._whitespace)
+        n = len(data) - len(data) % 4
+        self._pending = data[n:]
+        self.enclen += n
+        if n:
+            self._submit(data[:n])
+
+    def abort(self):
+        """
+        Gives up decoding, e.g. when the connection is lost in the middle of the BLOB. Releases the worker of the pool.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if self._task is not None:
+            self._chunks.put(None)
+            self._task = None
+
+    def finish(self):
+        """
+        Waits for the data still being decoded by the pool, if any.
+        @return: The decoded data, the buffer is trimmed to the number of bytes actually decoded
+        @rtype: bytearray
+        """
+        if self._pending:
+            self.enclen += len(self._pending)
+            self._submit(self._pending)
+            self._pending = ""
+        if self._task is not None:
+            self._chunks.put(None)
+            self._task.result()
+            self._task = None
+        if self._decompressor is not None:
+            self._write(self._decompressor.flush())
+            self._decompressor = None
+        self._view.release()
+        del self.buffer[self._offset:]
+        return self.buffer
+
+
 class indiblob(indielement):
     """
     @ivar format : A string describing the file-format/-extension (e.g C{.fits})
     @type format : StringType
+    @ivar _data : The decoded data if the BLOB was received in streaming mode (see L{_indiparser.stream_blobs}),
+    B{None} otherwise
+    @type _data : bytearray
+    @ivar _enclen : The size of the base64 encoded data received in streaming mode
+    @type _enclen : IntType
     """
 
+    __slots__ = ("format", "_data", "_enclen")
+
     def __init__(self, attrs, tag):
         indielement.__init__(self, attrs, tag)
         self.format = attrs.get('format', "").strip()
+        self._enclen = 0
+
+    def _set_value(self, value):
+        indielement._set_value(self, value)
+        self._data = None
+
+    def _begin_stream(self, attrs, pool=None, pool_size=0):
+        """
+        @param attrs: The attributes of the XML version of the BLOB
+        @type attrs: DictType
+        @param pool: The pool to decode the BLOB in, B{None} to decode it in the receiving thread
+        @type pool: concurrent.futures.Executor
+        @param pool_size: BLOBs of fewer bytes than this are decoded in the receiving thread anyway
+        @type pool_size: IntType
+        @return: A decoder to be fed with the character data of the BLOB
+        @rtype: L{_indiblobdecoder}
+        """
+        try:
+            size = int(attrs.get('size', "0").strip())
+        except ValueError:
+            size = 0
+        if size < pool_size:
+            pool = None
+        return _indiblobdecoder(size, self.format.endswith(".z"), pool)
+
+    def _end_stream(self, decoder):
+        """
+        Takes the data decoded by a L{_indiblobdecoder} as the value of the BLOB.
+        @param decoder: The decoder returned by L{_begin_stream}
+        @type decoder: L{_indiblobdecoder}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._set_value("")
+        self._data = decoder.finish()
+        self._enclen = decoder.enclen
 
     def _get_decoded_value(self):
         """
@@ -963,9 +1179,12 @@ class indiblob(indielement):
 
     def get_data(self):
         """
-        @return: the plain binary version of its data
-        @rtype: StringType
+        @return: the plain binary version of its data. A BLOB received in streaming mode returns the buffer
+        it was decoded into, without copying it, so it can be handed to C{numpy.frombuffer}.
+        @rtype: bytes or bytearray
         """
+        if self._data is not None:
+            return self._data
         return self._get_decoded_value()
 
     def get_text(self):
@@ -973,7 +1192,7 @@ class indiblob(indielement):
         @return: the plain binary version of its data
         @rtype: StringType
         """
-        return self._get_decoded_value()
+        return self.get_data()
 
     def set_from_file(self, filename):
         """
@@ -999,6 +1218,8 @@ class indiblob(indielement):
         string object returned by L{get_data}. Because blobs are base64 encoded and can be compressed.
         @rtype: StringType
         """
+        if self._data is not None:
+            return self._enclen
         return len(self._value)
 
     def set_from_string(self, text, format):
@@ -1026,6 +1247,8 @@ class indiblob(indielement):
 
     def updateByElement(self, element):
         self._set_value(element._value)
+        self._data = element._data
+        self._enclen = element._enclen
         self.format = element.format
 
 
@@ -1058,8 +1281,15 @@ class indivector(indinamedobject):
     @type device  : StringType
     @ivar _message  : The L{indimessage} associated with the vector or B{None} if not present
     @type _message  : L{indimessage}
+    @ivar _changed  : Notified each time the vector is updated or its L{_light} changes
+    @type _changed  : threading.Condition
+    @ivar _updates  : The number of times the vector has been received from the server (see L{wait_for_update})
+    @type _updates  : IntType
     """
 
+    __slots__ = ("host", "port", "elements", "_elementdict", "_perm", "group", "_light", "timeout", "timestamp",
+                 "device", "_message", "_changed", "_updates")
+
     def __init__(self, attrs, tag):
         """
         @param attrs: The attributes of the XML version of the INDI vector.
@@ -1079,6 +1309,9 @@ class indivector(indinamedobject):
         else:
             self._message = None
         self.elements = []
+        self._elementdict = {}
+        self._changed = threading.Condition()
+        self._updates = 0
         self.port = None
         self.host = None
 
@@ -1135,9 +1368,23 @@ class indivector(indinamedobject):
         @return: The element requested
         @rtype: L{indielement}
         """
-        for element in self.elements:
-            if elementname == element.name:
-                return element
+        element = self._elementdict.get(elementname)
+        if element is None and len(self._elementdict) != len(self.elements):
+            # L{elements} has been modified directly, rebuild the index
+            self._elementdict = {e.name: e for e in self.elements}
+            element = self._elementdict.get(elementname)
+        return element
+
+    def _add_element(self, element):
+        """
+        Appends an element to the vector and indexes it by its name.
+        @param element: The element to be added
+        @type element: L{indielement}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self.elements.append(element)
+        self._elementdict[element.name] = element
 
     def get_first_element(self):
         """
@@ -1147,25 +1394,75 @@ class indivector(indinamedobject):
         """
         return self.elements[0]
 
-    def _wait_for_ok_general(self, checkinterval, timeout):
+    def _set_light(self, light):
+        """
+        Replaces the L{indilight} of the vector and wakes up any thread waiting for the vector to change.
+        @param light: The new light
+        @type light: L{indilight}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        with self._changed:
+            self._light = light
+            self._updates = self._updates + 1
+            self._changed.notify_all()
+
+    def _set_state(self, state):
+        """
+        Sets the state of the L{indilight} of the vector in place and wakes up any thread waiting for the vector to change.
+        A missing or unknown state is taken as C{Alert}, like a newly received vector would do.
+        @param state: The new state (C{Idle}, C{Ok}, C{Busy} or C{Alert})
+        @type state: StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        with self._changed:
+            self._light._set_value("Alert")
+            self._light._set_value(state)
+            self._updates = self._updates + 1
+            self._changed.notify_all()
+
+    def get_update_count(self):
+        """
+        @return: The number of times the vector has been received from the server, to be given to L{wait_for_update}
+        @rtype: IntType
+        """
+        return self._updates
+
+    def wait_for_update(self, count, timeout):
+        """
+        Waits until the vector is received from the server again.
+        @param count: The value returned by L{get_update_count} before the update was requested
+        @type count: IntType
+        @param timeout: The maximum time to wait in seconds
+        @type timeout: FloatType
+        @return: C{True} if the vector has been received since L{get_update_count} returned L{count},
+        C{False} if the timeout expired
+        @rtype: BooleanType
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self._updates != count, timeout)
+
+    def _wait_for_ok_general(self, timeout):
         """
         Wait until its state is C{Ok}. Usually this means to wait until the server has
-        finished the operation requested by sending this vector.
+        finished the operation requested by sending this vector. The receiving thread
+        notifies L{_changed} as soon as a new state arrives, so there is no polling.
         @param timeout: An exception will be raised if the no C{Ok} was received for longer than timeout
         since this method was called.
         @type timeout: FloatType
-        @param checkinterval: The interval in which this method will check if the state is {Ok}
-        @type checkinterval: FloatType
         @return: B{None}
         @rtype: NoneType
         """
         t = time.time()
-        while not(self._light.is_ok()):
-            time.sleep(checkinterval)
-            if (time.time() - t) > timeout:
-                raise Exception("timeout waiting for state to turn Ok " +
-                                "devicename=" + self.device + " vectorname= " + self.name +
-                                " " + str(timeout) + " " + str(time.time() - t))
+        with self._changed:
+            while not(self._light.is_ok()):
+                remaining = timeout - (time.time() - t)
+                if remaining <= 0:
+                    raise Exception("timeout waiting for state to turn Ok " +
+                                    "devicename=" + self.device + " vectorname= " + self.name +
+                                    " " + str(timeout) + " " + str(time.time() - t))
+                self._changed.wait(remaining)
 
     def wait_for_ok_timeout(self, timeout):
         """
@@ -1174,10 +1471,7 @@ class indivector(indinamedobject):
         @return: B{None}
         @rtype:  NoneType
         """
-        checkinterval = 0.1
-        if timeout < checkinterval:
-            checkinterval = timeout
-        self._wait_for_ok_general(checkinterval, timeout)
+        return self._wait_for_ok_general(timeout)
 
     def wait_for_ok(self):
         """
@@ -1190,17 +1484,14 @@ class indivector(indinamedobject):
             timeout = 0.1
         else:
             timeout = float(self.timeout)
-        checkinterval = 0.1
-        if timeout < checkinterval:
-            checkinterval = timeout
-        self._wait_for_ok_general(checkinterval, timeout)
+        return self._wait_for_ok_general(timeout)
 
     def update(self, attrs, tag):
         indinamedobject.update(self, attrs, tag)
         self._check_writeable()
         self.timestamp = attrs.get('timestamp', "").strip()
         self.timeout = attrs.get('timeout', "").strip()
-        self._light = indilight(attrs, tag)
+        self._set_light(indilight(attrs, tag))
 
     def get_xml(self, transfertype):
         tag = self.tag.get_xml(transfertype)
@@ -1213,11 +1504,11 @@ class indivector(indinamedobject):
     def updateByVector(self, vector):
         self.timestamp = vector.timestamp
         self.timeout = vector.timeout
-        self._light = vector._light
         for oe in vector.elements:
-            for e in self.elements:
-                if e.name == oe.name:
-                    e.updateByElement(oe)
+            e = self.get_element(oe.name)
+            if e is not None:
+                e.updateByElement(oe)
+        self._set_light(vector._light)
 
     def getDevice(self):
         return self.device
@@ -1233,6 +1524,8 @@ class indiswitchvector(indivector):
     @type rule: StringType
     """
 
+    __slots__ = ("rule",)
+
     def __init__(self, attrs, tag):
         indivector.__init__(self, attrs, tag)
         self.rule = attrs.get('rule', "").strip()
@@ -1324,18 +1617,26 @@ class indiswitchvector(indivector):
 class indinumbervector(indivector):
     """A vector of numbers """
 
+    __slots__ = ()
+
 
 class indiblobvector(indivector):
     """A vector of BLOBs """
 
+    __slots__ = ()
+
 
 class inditextvector(indivector):
     """A vector of texts"""
 
+    __slots__ = ()
+
 
 class indilightvector(indivector):
     """A vector of lights """
 
+    __slots__ = ()
+
     def __init__(self, attrs, tag):
         self.tag = tag
         newattrs = attrs.copy()
@@ -1359,13 +1660,14 @@ class indimessage(indiobject):
     @type _value: StringType
     """
 
+    __slots__ = ("device", "timestamp", "_value")
+
     def __init__(self, attrs):
         """
         @param attrs: The attributes of the XML version of the INDI message.
         @type attrs: DictType
         """
-        tag = indixmltag(False, False, True, None, inditransfertypes.inew)
-        indiobject.__init__(self, attrs, tag)
+        indiobject.__init__(self, attrs, _inditags.create_tag("message"))
         self.device = attrs.get('device', "").strip()
         self.timestamp = attrs.get('timestamp', "").strip()
         self._value = attrs.get('message', "").strip()
@@ -1395,29 +1697,55 @@ class indimessage(indiobject):
 
 class _indilist(list):
     """" A list with a more sophisticated append() function.
-    It checks for the existence an object with the same name overwrites it, if there is one. Will become a dictionary  soon :-)"""
+    It checks for the existence an object with the same device and name and overwrites it, if there is one.
+    A dictionary indexed by C{(device, name)} is kept in sync with the list, so that lookups do not need to
+    walk the list.
+    @ivar list : The objects in the order they have been added
+    @type list : list
+    @ivar dict : The same objects indexed by C{(device, name)}
+    @type dict : DictType
+    """
 
     def __init__(self):
         self.list = []
+        self.dict = {}
+
+    @staticmethod
+    def _key(element):
+        return (getattr(element, 'device', None), element.name)
 
     def append(self, element):
         """
-        We check for an element within the list with the same name as the new element to be added
+        We check for an element within the list with the same device and name as the new element to be added
         an overwrite the old element, if one is found. Otherwise we just add the new element.
         @param element: the element has to be added to the list.
         @type element : any type that has an attribute name
         @return: B{None}
         @rtype: NoneType
         """
-        deleted = 1
-        while deleted == 1:
-            deleted = 0
-            for i, v in enumerate(self.list):
-                if (element.name == v.name):
-                    del self.list[i]
-                    deleted = 1
-                    break
-        self.list.append(element)
+        key = self._key(element)
+        old = self.dict.get(key)
+        if old is not None:
+            self.list[self.list.index(old)] = element
+        else:
+            self.list.append(element)
+        self.dict[key] = element
+
+    def get(self, devicename, name):
+        """
+        @param devicename: The name of the device
+        @type devicename: StringType
+        @param name: The name of the object
+        @type name: StringType
+        @return: The object matching L{devicename} and L{name}, B{None} if there is none
+        @rtype: L{indivector}
+        """
+        obj = self.dict.get((devicename, name))
+        if obj is None and len(self.dict) != len(self.list):
+            # L{list} has been modified directly, rebuild the index
+            self.dict = {self._key(v): v for v in self.list}
+            obj = self.dict.get((devicename, name))
+        return obj
 
 
 class _blocking_indi_object_handler:
@@ -1815,14 +2143,13 @@ def _sexagesimal(format, r):
     return output
 
 
-class bigindiclient(object):
+class _indiparser(object):
     """
-    @ivar socket  : a TCP/IP socket to communicate with the server
-    @type socket  : socket.socket.socket
+    The expat handlers turning the XML stream sent by an INDI server into L{indivector} and L{indimessage} objects.
+    Classes inheriting from this one decide what happens to the objects parsed by implementing L{_vector_parsed}
+    and L{_message_parsed}.
     @ivar expat : an expat XML parser
     @type expat : xml.parsers.expat
-    @ivar verbose :  If C{True} all XML data will be logged to the screen
-    @type verbose : BooleanType
     @ivar currentMessage : The INDI message currently being processed by the XML parser
     @type currentMessage : L{indimessage}
     @ivar currentElement : The INDI element currently being processed by the XML parser
@@ -1831,237 +2158,870 @@ class bigindiclient(object):
     @type currentData : StringType
     @ivar currentVector  : The INDI vector currently being processed by the XML parser
     @type currentVector  : L{indivector}
-    @ivar defvectorlist : A list of vectors that have been received with C{def*Vector} signal at least one time
-    @type defvectorlist : list of L{indivector}
+    @ivar currentDecoder : The decoder of the BLOB currently being streamed by the XML parser
+    @type currentDecoder : L{_indiblobdecoder}
+    @ivar stream_blobs : If C{True} BLOBs are base64 decoded while they are being received (see L{_indiblobdecoder})
+    instead of being accumulated as text and decoded by L{indiblob.get_data}
+    @type stream_blobs : BooleanType
+    @ivar blob_pool : The pool streamed BLOBs are decoded and decompressed in while the receiving thread goes on
+    parsing, B{None} to decode them in the receiving thread (see L{_indiblobdecoder}). Each parser has its own
+    single worker, so L{_indiblobdecoder.finish} never waits for a worker busy with the BLOB of another connection
+    @type blob_pool : concurrent.futures.Executor
+    @ivar blob_pool_size : BLOBs smaller than this number of bytes are decoded in the receiving thread, handing them
+    over would cost more than decoding them
+    @type blob_pool_size : IntType
+    @ivar update_in_place : If C{True} the C{set*Vector} messages of vectors already stored in L{indivectors} are
+    written straight into the stored vector and its elements, no new L{indivector} is created for them.
+    L{_vector_updated} is called instead of L{_vector_parsed}. BLOBs are always parsed into new objects.
+    @type update_in_place : BooleanType
+    @ivar currentTarget : The stored vector currently being updated in place by the XML parser
+    @type currentTarget : L{indivector}
     @ivar indivectors : The list of all indivectors received so far
     @type indivectors : L{_indilist} of L{indivector}
-    @ivar port : The port address of the INDI server, this instance of L{indiclient} is connected to
-    @type port : IntType
-    @ivar host  : The hostname of the INDI server, this instance of L{indiclient} is connected to
-    @type host  : StringType
-    @ivar receive_event_queue : A background process (L{_receiver}) is continuesly receiving data and putting them into this queue.
-    This queue  will be read by the L{process_events} method, that the user has to call in order to process any custom handlers.
-    @type receive_event_queue : Queue.Queue
-    @ivar running_queue : During its destructor indiclient puts signal into this queue in order to stop the background process.
-    @type running_queue : Queue.Queue
-    @ivar  timeout : A timeout value (see L{timeout_handler})
-    @type  timeout : FloatType
-    @ivar  timeout_handler : 	This function will be called whenever an indielement has been requested but was not received
-    for a time longer than C{timeout} since the request was issued. (see also L{set_timeout_handler})
-    @type  timeout_handler : function
-    @ivar blob_def_handler : Called when a new L{indiblobvector} is defined by the driver (see L{set_def_handlers})
-    @type blob_def_handler : function
-    @ivar number_def_handler : Called when a new L{indinumbervector} is defined by the driver (see L{set_def_handlers})
-    @type number_def_handler : function
-    @ivar text_def_handler : Called when a new L{inditextvector} is defined by the driver (see L{set_def_handlers})
-    @type text_def_handler : function
-    @ivar message_handler : (see L{set_message_handler})
-    @type message_handler : function
-    @ivar receivetimer : needed to run the _receive thread
-    @type receivetimer : threading.Timer
+    @ivar _store_lock : Held while L{indivectors} or the vectors stored in it are modified by the parser
+    @type _store_lock : threading.RLock
     @ivar _factory : A factory used to create and classify objects during the XML parsing process.
     @type _factory : _indiobjectfactory()
     """
 
-    def __init__(self, host, port):
-        """
-        @param host:  The hostname or IP address of the server you want to connect to
-        @type host: StringType
-        @param port:  The port address of the server you want to connect to.
-        @type port: IntType
-        """
+    def __init__(self):
         self._factory = _indiobjectfactory()
         self.indivectors = _indilist()
-        self.custom_element_handler_list = []
-        self.custom_vector_handler_list = []
-        self.defvectorlist = []
         self.currentVector = None
         self.currentElement = None
         self.currentMessage = None
         self.currentData = None
-        self.verbose = False
-        self.expat = xml.parsers.expat.ParserCreate()
-        self.expat.StartElementHandler = self._start_element
-        self.expat.EndElementHandler = self._end_element
-        self.expat.CharacterDataHandler = self._char_data
-        self.expat.Parse('<?xml version="1.5" encoding="UTF-8"?> <doc>', 0)
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.settimeout(2)
-        self.socket.connect((host, port))
-        self.host = host
-        self.port = port
-        self.socket.send("<getProperties version='1.5'/>".encode("utf8"))
-        self.receive_event_queue = queue.Queue()
-        self.running_queue = queue.Queue()
-        self.receive_vector_queue = queue.Queue()
-        self.timeout = 1
-        self.blob_def_handler = self._default_def_handler
-        self.number_def_handler = self._default_def_handler
-        self.switch_def_handler = self._default_def_handler
-        self.text_def_handler = self._default_def_handler
-        self.blob_def_handler = self._default_def_handler
-        self.light_def_handler = self._default_def_handler
-        self.message_handler = self._default_message_handler
-        self.timeout_handler = self._default_timeout_handler
-        self.running_queue.put(True)
-        self.receivetimer = threading.Timer(0.01, self._receiver)
-        self.receivetimer.start()
-        self.first = True
-
-    # def set_verbose(self):
-    # FIXME
-    # Does not work in the treaded version
-    # solution: add queue from indiclient to thread
-
-    def _element_received(self, vector, element):
-        """ Called during the L{process_events} method each time an INDI element has been received
-        @param vector: The vector containing the element that has been received
-        @type vector: indivector
-        @param element:  The element that has been received
-        @type element: indielement
+        self.currentDecoder = None
+        self.stream_blobs = True
+        self.blob_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indiblob")
+        self.blob_pool_size = 262144
+        self.update_in_place = True
+        self.currentTarget = None
+        self._targettag = None
+        self._targetattrs = None
+        self._targetvalues = []
+        self._inplacetags = set([self._factory._get_setvectortag(basename)
+                                 for basename in self._factory.basenames if basename != "BLOB"])
+        self._store_lock = threading.RLock()
+        self.expat = self._create_parser()
+
+    def _create_parser(self):
+        """
+        @return: A new expat parser, calling the handlers of this object, ready to receive the INDI stream
+        @rtype: xml.parsers.expat
+        """
+        parser = xml.parsers.expat.ParserCreate()
+        parser.StartElementHandler = self._start_element
+        parser.EndElementHandler = self._end_element
+        parser.CharacterDataHandler = self._char_data
+        # hand over large BLOBs in a few big fragments rather than many small ones
+        parser.buffer_text = True
+        parser.buffer_size = 65536
+        parser.Parse('<?xml version="1.5" encoding="UTF-8"?> <doc>', 0)
+        return parser
+
+    def _reset_parser(self):
+        """
+        Forgets about any partially parsed object and starts a new XML stream, e.g. after reconnecting.
+        The vectors stored in L{indivectors} are kept.
         @return: B{None}
         @rtype: NoneType
         """
-        for handler in self.custom_element_handler_list:
-            if ((handler.vectorname == vector.name) and (handler.elementname == element.name) and
-                    (handler.devicename == vector.device)):
-                handler.indi_object_change_notify(vector, element)
+        self.currentVector = None
+        self.currentElement = None
+        self.currentMessage = None
+        self.currentData = None
+        if self.currentDecoder is not None:
+            self.currentDecoder.abort()
+        self.currentDecoder = None
+        self.currentTarget = None
+        self._targetattrs = None
+        del self._targetvalues[:]
+        self.expat = self._create_parser()
 
-    def _vector_received(self, vector):
-        """ Called during the L{process_events} method each time an indivector element has been received
-        @param vector: The vector that has been received
-        @type vector: indivector
+    def _close_parser(self):
+        """
+        Gives up the BLOB being received, if any, and stops the worker of L{blob_pool} once the parser is done with.
         @return: B{None}
         @rtype: NoneType
         """
-        for handler in self.custom_vector_handler_list:
-            if ((handler.vectorname == vector.name) and (handler.devicename == vector.device)):
-                handler.indi_object_change_notify(vector)
+        if self.currentDecoder is not None:
+            self.currentDecoder.abort()
+            self.currentDecoder = None
+        if self.blob_pool is not None:
+            self.blob_pool.shutdown(wait=False)
 
-    def reset_connection(self):
+    def _vector_parsed(self, vector):
         """
-        Resets the connection to the server
+        Called by the parser each time a complete vector has been received.
+        @param vector: The vector received
+        @type vector: L{indivector}
         @return: B{None}
         @rtype: NoneType
         """
-        log.info("Resetting connection port...")
-        for i in range(10):
-            time.sleep(0.1)
-            self.receivetimer.cancel()
-        time.sleep(0.3)
-        self.socket.close()
-        time.sleep(3)
-        self.expat = xml.parsers.expat.ParserCreate()
-        self.expat.StartElementHandler = self._start_element
-        self.expat.EndElementHandler = self._end_element
-        self.expat.CharacterDataHandler = self._char_data
-        self.expat.Parse('<?xml version="1.5" encoding="UTF-8"?> <doc>', 0)
-        failed = True
-        while failed:
-            failed = False
-            try:
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.settimeout(0.1)
-                self.socket.connect((self.host, self.port))
-                self.socket.send("<getProperties version='1.5'/>".encode("utf8"))
-            except Exception as e:
-                time.sleep(1)
-                log.warning(f"Connection attempt failed: {e}")
-                failed = True
-        log.info("Connection reset successfully")
-        self.receivetimer = threading.Timer(0.1, self._receiver)
-        self.receivetimer.start()
+        raise NotImplementedError
 
-    def quit(self):
+    def _vector_updated(self, vector):
         """
-        must be called in order to close the indiclient instance
+        Called by the parser each time a stored vector has been updated in place (see L{update_in_place}).
+        @param vector: The vector stored in L{indivectors}
+        @type vector: L{indivector}
         @return: B{None}
         @rtype: NoneType
         """
-        None
-        self.receivetimer.cancel()
-        self.socket.close()
-        self.running_queue.put(False)
-
-    def tell(self):
-        """
-        Logs all indivectors and their elements to the screen
-        @return: B{None}
-        @rtype: NoneType"""
-        for indivector in self.indivectors.list:
-            indivector.tell()
+        raise NotImplementedError
 
-    def _get_and_update_vector(self, attrs, tag):
+    def _message_parsed(self, message):
         """
-        Looks for an existing indivector matching the C{device} and C{name} attibutes given in L{attrs}, and updates it
-        according to L{attrs}
-        @param attrs: The attributes of the XML version of the INDI object.
-        @type attrs: DictType
-        @param tag : the XML tag denoting the vector
-        @type tag : StringType
+        Called by the parser each time an INDI message has been received.
+        @param message: The message received
+        @type message: L{indimessage}
         @return: B{None}
         @rtype: NoneType
         """
-        devicename = attrs.get('device', "").strip()
-        vectorname = attrs.get('name', "").strip()
-        for i, vector in enumerate(self.indivectors.list):
-            if (devicename == vector.device) and (vectorname == vector.name):
-                vector.update(attrs, tag)
-                return vector
-        return None
+        raise NotImplementedError
 
-    def _get_and_update_element(self, attrs, tag):
+    def _get_vector(self, devicename, vectorname):
+        return self.indivectors.get(devicename, vectorname)
+
+    def _update_target(self):
         """
-        Looks in C{self.currentVector} for an existing indivector matching the  C{name} attibute given in L{attrs}, and updates it
-        according to L{attrs}.
-        @param attrs: The attributes of the XML version of the INDI object.
-        @type attrs: DictType
-        @param tag : the XML tag denoting the vector
-        @type tag : StringType
+        Writes the values collected for L{currentTarget} into its elements, all at once under L{_store_lock},
+        so nobody sees a half updated vector.
         @return: B{None}
         @rtype: NoneType
         """
-        element = self.get_element(
-            self.currentVector.device,
-            self.currentVector.name,
-            attrs.get('name', "").strip()
-        )
-        element.update(attrs, tag)
-        return element
+        vector = self.currentTarget
+        attrs = self._targetattrs
+        with self._store_lock:
+            for element, value in self._targetvalues:
+                element._set_value(value)
+            vector.timestamp = attrs.get('timestamp', "").strip()
+            vector.timeout = attrs.get('timeout', "").strip()
+            vector._set_state(attrs.get('state', "").strip())
+        del self._targetvalues[:]
+        self.currentTarget = None
+        self._targetattrs = None
+        self._vector_updated(vector)
 
-    def _receiver(self):
-        """
-        A "thread" that receives data from the server
+    def _char_data(self, data):
+        """Char data handler for expat parser. For details (see
+        U{http://www.python.org/doc/current/lib/expat-example.html})
+        @param data: The data contained in the INDI element
+        @type data: StringType
         @return: B{None}
         @rtype: NoneType
         """
-        self.running = True
-        while self.running:
-            self._receive()
-            while self.running_queue.empty() is False:
-                self.running = self.running_queue.get()
-                self.running_queue.task_done()
+        if self.currentElement is None:
+            return None
+        if self.currentVector is None and self.currentTarget is None:
+            return None
+        if self.currentDecoder is not None:
+            self.currentDecoder.feed(data)
+        else:
+            self.currentData.append(data)
 
-    def send_vector(self, vector):
-        """
-        Sends an INDI vector to the INDI server.
-        @param vector:  The INDI vector to be send
-        @type vector: indivector
+    def _end_element(self, name):
+        """End of XML element handler for expat parser. For details (see
+        U{http://www.python.org/doc/current/lib/expat-example.html})
+        @param name : The name of the XML object
+        @type name : StringType
         @return: B{None}
         @rtype: NoneType
         """
-        if not vector.tag.is_vector():
-            return
-        data = vector.get_xml(inditransfertypes.inew)
-        self.socket.send(data.encode("utf8"))
-        vector._light._set_value("Busy")
-
-    def wait_until_vector_available(self, devicename, vectorname):
-        """
-        Looks if the requested vector has already been received and waits until it is received otherwise
-        @param devicename:  The name of the device
-        @type devicename: StringType
-        @param vectorname:  The name of the vector
+        if self.currentTarget is not None:
+            if name == self._targettag:
+                self._update_target()
+            elif self.currentElement is not None:
+                value = "".join(self.currentData).replace('\\n', '').strip()
+                self._targetvalues.append((self.currentElement, value))
+                self.currentElement = None
+            return None
+        if self.currentVector is None:
+            return None
+        self.currentVector.host = self.host
+        self.currentVector.port = self.port
+        if self.currentElement is not None:
+            if self.currentElement.tag.get_initial_tag() == name:
+                if self.currentDecoder is not None:
+                    self.currentElement._end_stream(self.currentDecoder)
+                    self.currentDecoder = None
+                else:
+                    string_currentData = "".join(self.currentData).replace('\\n', '').strip()
+                    self.currentElement._set_value(string_currentData)
+                self.currentVector._add_element(self.currentElement)
+                self.currentElement = None
+                self.currentData = None
+        if self.currentVector.tag.get_initial_tag() == name:
+            self._vector_parsed(self.currentVector)
+            self.currentVector = None
+
+    def _start_element(self, name, attrs):
+        """
+        Start XML element handler for expat parser. For details (see
+        U{http://www.python.org/doc/current/lib/expat-example.html})
+        @param name : The name of the XML object
+        @type name : StringType
+        @param attrs : The attributes of the XML object
+        @type attrs : DictType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if self.currentTarget is not None:
+            self.currentElement = self.currentTarget.get_element(attrs.get('name', "").strip())
+            self.currentData = []
+            return
+        if self.update_in_place and name in self._inplacetags:
+            target = self._get_vector(attrs.get('device', "").strip(), attrs.get('name', "").strip())
+            if target is not None:
+                if 'message' in attrs:
+                    self._message_parsed(indimessage(attrs))
+                self.currentTarget = target
+                self._targettag = name
+                self._targetattrs = attrs
+                return
+        obj = self._factory.create(name, attrs)
+        if obj is None:
+            return
+        if 'message' in attrs:
+            self._message_parsed(indimessage(attrs))
+        if obj.tag.is_vector():
+            if obj.tag.get_transfertype() in (inditransfertypes.idef, inditransfertypes.iset):
+                self.currentVector = obj
+        if self.currentVector is not None:
+            if obj.tag.is_element():
+                if self.currentVector.tag.get_transfertype() in (inditransfertypes.idef, inditransfertypes.iset):
+                    self.currentElement = obj
+                    if self.stream_blobs and isinstance(obj, indiblob):
+                        self.currentDecoder = obj._begin_stream(attrs, self.blob_pool, self.blob_pool_size)
+        self.currentData = []
+
+
+_indiconnections = {}
+"""The shared L{_indiconnection} objects keyed by C{(host, port)} (see L{_get_indiconnection})"""
+_indiconnections_lock = threading.Lock()
+
+
+def _get_indiconnection(host, port):
+    """
+    Returns the connection to the given server shared by all the clients in this process,
+    a new one is opened if there is none yet.
+    @param host:  The hostname or IP address of the server
+    @type host: StringType
+    @param port:  The port address of the server
+    @type port: IntType
+    @return: The connection to the server
+    @rtype: L{_indiconnection}
+    """
+    with _indiconnections_lock:
+        connection = _indiconnections.get((host, port))
+        if connection is None or connection._stop.is_set():
+            connection = _indiconnection(host, port)
+            _indiconnections[(host, port)] = connection
+        return connection
+
+
+class _indiconnection(_indiparser):
+    """
+    A TCP connection to an INDI server with its receiving thread, its XML parser and the store of the vectors
+    received. It is shared by all the L{bigindiclient} objects talking to the same server (see L{_get_indiconnection}),
+    so every property update is received and parsed only once. Events are routed to the clients by device.
+    @ivar socket  : a TCP/IP socket to communicate with the server
+    @type socket  : socket.socket.socket
+    @ivar verbose :  If C{True} all XML data will be logged to the screen
+    @type verbose : BooleanType
+    @ivar port : The port address of the INDI server
+    @type port : IntType
+    @ivar host  : The hostname of the INDI server
+    @type host  : StringType
+    @ivar clients : The clients attached to this connection, replaced rather than modified when a client
+    attaches or detaches, so the receiving thread can iterate over it without locking
+    @type clients : ListType of L{bigindiclient}
+    @ivar _received : Notified by the background process (L{_receiver}) each time a vector has been stored or
+    updated in L{indivectors}. It shares its lock with L{_store_lock}.
+    @type _received : threading.Condition
+    @ivar running_queue : L{quit} puts a signal into this queue in order to stop the background process.
+    @type running_queue : Queue.Queue
+    @ivar reconnect_delay : The delay in seconds before the first reconnection attempt, it doubles with each failed
+    attempt. A random jitter of up to half the delay is subtracted, so clients of a restarted server do not
+    come back all at once.
+    @type reconnect_delay : FloatType
+    @ivar reconnect_max_delay : The maximum delay in seconds between two reconnection attempts
+    @type reconnect_max_delay : FloatType
+    @ivar reconnect_wait : How long in seconds a send waits for a lost connection to come back before giving up
+    @type reconnect_wait : FloatType
+    @ivar receivetimer : needed to run the _receive thread
+    @type receivetimer : threading.Timer
+    @ivar _properties : The devices properties have been requested for, B{None} stands for all devices
+    @type _properties : SetType
+    @ivar _blob_devices : The devices BLOBs have been enabled for, B{None} stands for all devices
+    @type _blob_devices : SetType
+    @ivar _online : Set while the connection to the server is up
+    @type _online : threading.Event
+    @ivar _stop : Set by L{quit}, stops the receiving thread and any reconnection attempt
+    @type _stop : threading.Event
+    """
+
+    def __init__(self, host, port):
+        """
+        @param host:  The hostname or IP address of the server you want to connect to
+        @type host: StringType
+        @param port:  The port address of the server you want to connect to.
+        @type port: IntType
+        """
+        _indiparser.__init__(self)
+        self.verbose = False
+        self.host = host
+        self.port = port
+        self.clients = []
+        self.socket = self._connect()
+        self.running_queue = queue.Queue()
+        self._received = threading.Condition(self._store_lock)
+        self._send_lock = threading.Lock()
+        self.reconnect_delay = 0.1
+        self.reconnect_max_delay = 10.0
+        self.reconnect_wait = 5.0
+        self._properties = set()
+        self._blob_devices = set()
+        self._online = threading.Event()
+        self._online.set()
+        self._stop = threading.Event()
+        self.running_queue.put(True)
+        self.receivetimer = threading.Timer(0.01, self._receiver)
+        self.receivetimer.start()
+
+    def attach(self, client):
+        """
+        Adds a client to the connection and asks the server for the properties of its device.
+        @param client: The client
+        @type client: L{bigindiclient}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        with _indiconnections_lock:
+            self.clients = self.clients + [client]
+        self._properties.add(client.devicename)
+        self._send(self._get_properties_xml(client.devicename))
+
+    def detach(self, client):
+        """
+        Removes a client from the connection, the connection is closed when its last client is gone.
+        @param client: The client
+        @type client: L{bigindiclient}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        with _indiconnections_lock:
+            if client in self.clients:
+                self.clients = [c for c in self.clients if c is not client]
+            if len(self.clients) > 0:
+                return
+            if _indiconnections.get((self.host, self.port)) is self:
+                del _indiconnections[(self.host, self.port)]
+        self.quit()
+
+    def _get_properties_xml(self, devicename):
+        """
+        @param devicename: The device whose properties are requested, B{None} for all devices
+        @type devicename: StringType
+        @return: A C{getProperties} request
+        @rtype: StringType
+        """
+        if devicename is None:
+            return "<getProperties version='1.5'/>"
+        return "<getProperties version='1.5' device='%s'/>" % devicename
+
+    def _enable_blob_xml(self, devicename):
+        """
+        @param devicename: The device BLOBs are enabled for, B{None} for all devices
+        @type devicename: StringType
+        @return: An C{enableBLOB} request
+        @rtype: StringType
+        """
+        if devicename is None:
+            return "<enableBLOB>Also</enableBLOB>\n"
+        return "<enableBLOB device='%s'>Also</enableBLOB>\n" % devicename
+
+    def _route(self, obj):
+        """
+        Queues a vector or message received for L{bigindiclient.process_events} of each client interested in its device.
+        @param obj: The vector or message received
+        @type obj: L{indivector} or L{indimessage}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        for client in self.clients:
+            if client.devicename is None or obj.device in ("", client.devicename):
+                client.receive_event_queue.put(obj)
+
+    def _connect(self):
+        """
+        @return: A new socket connected to L{host} and L{port}
+        @rtype: socket.socket
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(2)
+        try:
+            sock.connect((self.host, self.port))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _drop_connection(self):
+        """
+        Shuts the socket down, the receiving thread notices it and starts reconnecting (see L{_reconnect}).
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._online.clear()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _reconnect(self):
+        """
+        Called by the receiving thread when the connection has been lost. Tries to connect again with an
+        exponential backoff (see L{reconnect_delay}) until it succeeds or L{quit} is called. The vectors in
+        L{indivectors} are kept, the C{def*Vector} sent by the server after C{getProperties} update them in place,
+        so references held by device wrappers stay valid.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._online.clear()
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+        log.warning("Lost connection to %s:%d" % (self.host, self.port))
+        for client in self.clients:
+            client.connection_handler("disconnected", client)
+        attempt = 0
+        while not self._stop.is_set():
+            delay = min(self.reconnect_max_delay, self.reconnect_delay * 2 ** attempt)
+            if self._stop.wait(random.uniform(delay / 2, delay)):
+                return
+            attempt = attempt + 1
+            try:
+                sock = self._connect()
+                data = "".join([self._get_properties_xml(devicename) for devicename in list(self._properties)] +
+                               [self._enable_blob_xml(devicename) for devicename in list(self._blob_devices)])
+                sock.sendall(data.encode("utf8"))
+            except OSError as e:
+                log.warning(f"Reconnection attempt {attempt} failed: {e}")
+                continue
+            self._reset_parser()
+            with self._send_lock:
+                self.socket = sock
+            self._online.set()
+            log.info("Reconnected to %s:%d" % (self.host, self.port))
+            for client in self.clients:
+                client.connection_handler("connected", client)
+            return
+
+    def reset_connection(self):
+        """
+        Resets the connection to the server. The receiving thread reconnects in the background, this method
+        waits at most L{reconnect_wait} seconds for it.
+        @return: C{True} if the connection is up again, C{False} otherwise
+        @rtype: BooleanType
+        """
+        log.info("Resetting connection port...")
+        self._drop_connection()
+        return self.wait_until_connected(self.reconnect_wait)
+
+    def is_connected(self):
+        """
+        @return: C{True} if the connection to the server is currently up
+        @rtype: BooleanType
+        """
+        return self._online.is_set()
+
+    def wait_until_connected(self, timeout):
+        """
+        Waits until the connection to the server is up.
+        @param timeout: The maximum time to wait in seconds
+        @type timeout: FloatType
+        @return: C{True} if the connection is up, C{False} if the timeout expired
+        @rtype: BooleanType
+        """
+        return self._online.wait(timeout)
+
+    def quit(self):
+        """
+        Closes the connection, called by L{detach} when the last client is gone
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._stop.set()
+        self.receivetimer.cancel()
+        self.socket.close()
+        self.running_queue.put(False)
+
+    def _get_and_update_vector(self, attrs, tag):
+        """
+        Looks for an existing indivector matching the C{device} and C{name} attibutes given in L{attrs}, and updates it
+        according to L{attrs}
+        @param attrs: The attributes of the XML version of the INDI object.
+        @type attrs: DictType
+        @param tag : the XML tag denoting the vector
+        @type tag : StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        devicename = attrs.get('device', "").strip()
+        vectorname = attrs.get('name', "").strip()
+        vector = self.indivectors.get(devicename, vectorname)
+        if vector is not None:
+            vector.update(attrs, tag)
+        return vector
+
+    def _get_and_update_element(self, attrs, tag):
+        """
+        Looks in C{self.currentVector} for an existing indivector matching the  C{name} attibute given in L{attrs}, and updates it
+        according to L{attrs}.
+        @param attrs: The attributes of the XML version of the INDI object.
+        @type attrs: DictType
+        @param tag : the XML tag denoting the vector
+        @type tag : StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        element = self.currentVector.get_element(attrs.get('name', "").strip())
+        element.update(attrs, tag)
+        return element
+
+    def _receiver(self):
+        """
+        A "thread" that receives data from the server
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self.running = True
+        while self.running and not self._stop.is_set():
+            self._receive()
+            while self.running_queue.empty() is False:
+                self.running = self.running_queue.get()
+                self.running_queue.task_done()
+        self._close_parser()
+
+    def _send(self, data):
+        """
+        Writes data to the socket. If the connection is down, waits at most L{reconnect_wait} seconds
+        for the receiving thread to bring it back.
+        @param data: The XML data to be sent
+        @type data: StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        data = data.encode("utf8")
+        for attempt in range(2):
+            if not self.wait_until_connected(self.reconnect_wait):
+                break
+            with self._send_lock:
+                try:
+                    self.socket.sendall(data)
+                    return
+                except OSError as e:
+                    log.warning(f"Sending to {self.host}:{self.port} failed: {e}")
+            self._drop_connection()
+        raise Exception("indiclient: not connected to %s:%d" % (self.host, self.port))
+
+    def _vector_parsed(self, vector):
+        """
+        Called by the receiving thread each time a complete vector has been parsed. Stores it in L{indivectors}
+        or updates the stored one, wakes up anybody waiting for it and routes it to the clients.
+        @param vector: The vector received
+        @type vector: L{indivector}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        with self._received:
+            stored = self._get_vector(vector.device, vector.name)
+            if stored is None:
+                self.indivectors.append(vector)
+            else:
+                stored.updateByVector(vector)
+            self._received.notify_all()
+        self._route(vector)
+
+    def _vector_updated(self, vector):
+        """
+        Called by the receiving thread each time a stored vector has been updated in place.
+        Only the stored vector itself is routed to the clients, nothing is copied.
+        @param vector: The vector stored in L{indivectors}
+        @type vector: L{indivector}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._route(vector)
+
+    def _message_parsed(self, message):
+        """
+        Called by the receiving thread each time an INDI message has been parsed.
+        Routes it to the clients.
+        @param message: The message received
+        @type message: L{indimessage}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._route(message)
+
+    def _receive(self):
+        """receive data from the server
+        @return: B{None}
+        @rtype: NoneType
+        """
+        try:
+            data = self.socket.recv(1000000)
+        except socket.timeout:
+            return None
+        except OSError:
+            data = b""
+        if data == b"":
+            # the server closed the connection (or quit() closed the socket)
+            if not self._stop.is_set():
+                self._reconnect()
+            return None
+        if self.verbose:
+            log.debug(data)
+        return self.expat.Parse(data, 0)
+
+    def enable_blob(self, devicename):
+        """
+        Sends a signal to the server that tells it to send L{indiblob} objects of a device.
+        @param devicename: The device, B{None} for all devices
+        @type devicename: StringType
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self._blob_devices.add(devicename)
+        self._send(self._enable_blob_xml(devicename))
+
+
+class bigindiclient(object):
+    """
+    @ivar connection : The connection to the server, shared with the other clients of the same server
+    (see L{_get_indiconnection})
+    @type connection : L{_indiconnection}
+    @ivar devicename : The device this client is interested in, B{None} for all devices. Only the properties of
+    this device are requested from the server, and only its events end up in L{receive_event_queue}.
+    @type devicename : StringType
+    @ivar verbose :  If C{True} all XML data will be logged to the screen
+    @type verbose : BooleanType
+    @ivar defvectors : The C{(device, name)} keys of the vectors that have been received with C{def*Vector} signal
+    at least one time
+    @type defvectors : SetType of TupleType
+    @ivar custom_element_handlers : The custom element handlers (see L{add_custom_element_handler}) keyed by
+    C{(device, vector, element)}
+    @type custom_element_handlers : DictType of ListType of L{indi_custom_element_handler}
+    @ivar custom_vector_handlers : The custom vector handlers (see L{add_custom_vector_handler}) keyed by
+    C{(device, vector)}
+    @type custom_vector_handlers : DictType of ListType of L{indi_custom_vector_handler}
+    @ivar port : The port address of the INDI server, this instance of L{indiclient} is connected to
+    @type port : IntType
+    @ivar host  : The hostname of the INDI server, this instance of L{indiclient} is connected to
+    @type host  : StringType
+    @ivar receive_event_queue : The receiving thread of the connection is continuesly receiving data and putting
+    them into this queue. This queue  will be read by the L{process_events} method, that the user has to call in
+    order to process any custom handlers.
+    @type receive_event_queue : Queue.Queue
+    @ivar  timeout : A timeout value (see L{timeout_handler})
+    @type  timeout : FloatType
+    @ivar  timeout_handler : 	This function will be called whenever an indielement has been requested but was not received
+    for a time longer than C{timeout} since the request was issued. (see also L{set_timeout_handler})
+    @type  timeout_handler : function
+    @ivar blob_def_handler : Called when a new L{indiblobvector} is defined by the driver (see L{set_def_handlers})
+    @type blob_def_handler : function
+    @ivar number_def_handler : Called when a new L{indinumbervector} is defined by the driver (see L{set_def_handlers})
+    @type number_def_handler : function
+    @ivar text_def_handler : Called when a new L{inditextvector} is defined by the driver (see L{set_def_handlers})
+    @type text_def_handler : function
+    @ivar message_handler : (see L{set_message_handler})
+    @type message_handler : function
+    @ivar connection_handler : Called with C{"disconnected"} or C{"connected"} whenever the connection to the server
+    is lost or restored (see L{set_connection_handler})
+    @type connection_handler : function
+    """
+
+    def __init__(self, host, port, devicename=None, shared=True):
+        """
+        @param host:  The hostname or IP address of the server you want to connect to
+        @type host: StringType
+        @param port:  The port address of the server you want to connect to.
+        @type port: IntType
+        @param devicename:  The device you are interested in, B{None} for all devices
+        @type devicename: StringType
+        @param shared:  If C{True} the connection to the server is shared with the other clients of the same server,
+        otherwise a connection of its own is opened
+        @type shared: BooleanType
+        """
+        self.custom_element_handlers = {}
+        self.custom_vector_handlers = {}
+        self.defvectors = set()
+        self.verbose = False
+        self.host = host
+        self.port = port
+        self.devicename = devicename
+        self.receive_event_queue = queue.Queue()
+        # the vectors collected by batch, per thread
+        self._batch = threading.local()
+        self.timeout = 1
+        self.blob_def_handler = self._default_def_handler
+        self.number_def_handler = self._default_def_handler
+        self.switch_def_handler = self._default_def_handler
+        self.text_def_handler = self._default_def_handler
+        self.blob_def_handler = self._default_def_handler
+        self.light_def_handler = self._default_def_handler
+        self.message_handler = self._default_message_handler
+        self.timeout_handler = self._default_timeout_handler
+        self.connection_handler = self._default_connection_handler
+        if shared:
+            self.connection = _get_indiconnection(host, port)
+        else:
+            self.connection = _indiconnection(host, port)
+        self.connection.attach(self)
+        self.first = True
+
+    # def set_verbose(self):
+    # FIXME
+    # Does not work in the treaded version
+    # solution: add queue from indiclient to thread
+
+    def _element_received(self, vector, element):
+        """ Called during the L{process_events} method each time an INDI element has been received
+        @param vector: The vector containing the element that has been received
+        @type vector: indivector
+        @param element:  The element that has been received
+        @type element: indielement
+        @return: B{None}
+        @rtype: NoneType
+        """
+        for handler in self.custom_element_handlers.get((vector.device, vector.name, element.name), ()):
+            handler.indi_object_change_notify(vector, element)
+
+    def _vector_received(self, vector):
+        """ Called during the L{process_events} method each time an indivector element has been received
+        @param vector: The vector that has been received
+        @type vector: indivector
+        @return: B{None}
+        @rtype: NoneType
+        """
+        for handler in self.custom_vector_handlers.get((vector.device, vector.name), ()):
+            handler.indi_object_change_notify(vector)
+
+    @property
+    def indivectors(self):
+        """
+        @return: The vectors received so far, shared by all the clients of the connection
+        @rtype: L{_indilist} of L{indivector}
+        """
+        return self.connection.indivectors
+
+    def reset_connection(self):
+        """
+        Resets the connection to the server. The receiving thread reconnects in the background, this method
+        waits at most C{reconnect_wait} seconds for it (see L{_indiconnection}).
+        @return: C{True} if the connection is up again, C{False} otherwise
+        @rtype: BooleanType
+        """
+        return self.connection.reset_connection()
+
+    def is_connected(self):
+        """
+        @return: C{True} if the client is currently connected to the server
+        @rtype: BooleanType
+        """
+        return self.connection.is_connected()
+
+    def wait_until_connected(self, timeout):
+        """
+        Waits until the client is connected to the server.
+        @param timeout: The maximum time to wait in seconds
+        @type timeout: FloatType
+        @return: C{True} if the client is connected, C{False} if the timeout expired
+        @rtype: BooleanType
+        """
+        return self.connection.wait_until_connected(timeout)
+
+    def quit(self):
+        """
+        must be called in order to close the indiclient instance. The connection to the server is closed
+        once all the clients sharing it have quit.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self.connection.detach(self)
+
+    def tell(self):
+        """
+        Logs all indivectors and their elements to the screen
+        @return: B{None}
+        @rtype: NoneType"""
+        for indivector in self.indivectors.list:
+            indivector.tell()
+
+    def send_vector(self, vector):
+        """
+        Sends an INDI vector to the INDI server.
+        @param vector:  The INDI vector to be send
+        @type vector: indivector
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if not vector.tag.is_vector():
+            return
+        batch = getattr(self._batch, "vectors", None)
+        if batch is not None:
+            batch.append(vector)
+            return
+        self._send_vectors([vector])
+
+    def _send_vectors(self, vectors):
+        """
+        Serializes the vectors into a single buffer and writes it to the socket in one go.
+        The vectors are marked C{Busy} before they are sent, so a fast C{Ok} reply can not be overwritten.
+        @param vectors:  The INDI vectors to be send
+        @type vectors: ListType of L{indivector}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        data = "".join([vector.get_xml(inditransfertypes.inew) for vector in vectors])
+        for vector in vectors:
+            with vector._changed:
+                vector._light._set_value("Busy")
+        self.connection._send(data)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collects the vectors sent inside a C{with client.batch():} block and sends them when the block is left.
+        Changes to several elements of the same vector are sent as a single C{new*Vector}, and all vectors
+        go out with a single write, so the driver never sees half of an update (e.g. a new RA with the old DEC).
+        Nothing is sent if the block raises an exception. Batches can be nested, the outermost one sends.
+        A batch only collects the vectors sent by the thread that opened it, the other threads keep sending at once.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        if getattr(self._batch, "vectors", None) is not None:
+            yield
+            return
+        self._batch.vectors = _indilist()
+        try:
+            yield
+            vectors = self._batch.vectors.list
+        finally:
+            self._batch.vectors = None
+        if len(vectors) > 0:
+            self._send_vectors(vectors)
+
+    def wait_until_vector_available(self, devicename, vectorname):
+        """
+        Looks if the requested vector has already been received and waits until it is received otherwise
+        @param devicename:  The name of the device
+        @type devicename: StringType
+        @param vectorname:  The name of the vector
         @type vectorname: StringType
         @return: B{None}
         @rtype: NoneType
@@ -2070,33 +3030,19 @@ class bigindiclient(object):
 
     def process_receive_vector_queue(self):
         """
-        Process the entries form the receive_vector_queue created
-        by the parsing thread and update the self.indivector.list
-        """
-        while self.receive_vector_queue.empty() is False:
-            newVector = self.receive_vector_queue.get()
-            devicename = newVector.getDevice()
-            vectorname = newVector.getName()
-            got = False
-            for vector in self.indivectors.list:
-                if (devicename == vector.device) and (vectorname == vector.name):
-                    vector.updateByVector(newVector)
-                    got = True
-            if not got:
-                self.indivectors.list.append(newVector)
-            self.receive_vector_queue.task_done()
-
-    def _get_vector(self, devicename, vectorname):
-        for vector in self.indivectors.list:
-            if (devicename == vector.device) and (vectorname == vector.name):
-                return vector
-        return None
+        Kept for compatibility, there is nothing left to do here: the receiving thread stores and updates the
+        vectors in L{indivectors} itself.
+        @return: B{None}
+        @rtype: NoneType
+        """
+        pass
 
     def get_vector(self, devicename, vectorname):
         """
         Returns an L{indivector} matching the given L{devicename} and L{vectorname}
         This method will wait until it has been received. In case the vector doesn't exists this
-        routine will never return.
+        routine will call the L{timeout_handler} after L{timeout} seconds and return B{None}.
+        The wait is woken up by the receiving thread each time a vector arrives.
         @param devicename:  The name of the device
         @type devicename: StringType
         @param vectorname:  The name of the vector
@@ -2105,19 +3051,18 @@ class bigindiclient(object):
         @rtype: L{indivector}
         """
         t = time.time()
-        while True:
-            v = self._get_vector(devicename, vectorname)
-            if v is None:
-                time.sleep(0.01)
-                self.process_receive_vector_queue()
-                v = self._get_vector(devicename, vectorname)
+        received = self.connection._received
+        with received:
+            while True:
+                v = self.connection._get_vector(devicename, vectorname)
                 if v is not None:
                     return v
-            else:
-                return v
-            if ((time.time() - t) > self.timeout):
-                self.timeout_handler(devicename, vectorname, self)
-                return None
+                remaining = self.timeout - (time.time() - t)
+                if remaining <= 0:
+                    break
+                received.wait(remaining)
+        self.timeout_handler(devicename, vectorname, self)
+        return None
 
     def get_element(self, devicename, vectorname, elementname):
         """
@@ -2134,9 +3079,7 @@ class bigindiclient(object):
         @rtype: L{indielement}
         """
         vector = self.get_vector(devicename, vectorname)
-        for i, element in enumerate(vector.elements):
-            if elementname == element.name:
-                return element
+        return vector.get_element(elementname)
 
     def add_mini_element_handler(self, devicename, vectorname, elementname, handlermethod):
         """
@@ -2170,7 +3113,8 @@ class bigindiclient(object):
         @rtype: L{indi_custom_element_handler}
         """
         handler.indi = self
-        self.custom_element_handler_list.append(handler)
+        key = (handler.devicename, handler.vectorname, handler.elementname)
+        self.custom_element_handlers.setdefault(key, []).append(handler)
         vector = self.get_vector(handler.devicename, handler.vectorname)
         element = vector.get_element(handler.elementname)
         handler.configure(vector, element)
@@ -2189,7 +3133,8 @@ class bigindiclient(object):
         @rtype: L{indi_custom_vector_handler}
         """
         handler.indi = self
-        self.custom_vector_handler_list.append(handler)
+        key = (handler.devicename, handler.vectorname)
+        self.custom_vector_handlers.setdefault(key, []).append(handler)
         vector = self.get_vector(handler.devicename, handler.vectorname)
         handler.configure(vector)
         handler.indi_object_change_notify(vector)
@@ -2238,6 +3183,31 @@ class bigindiclient(object):
         """
         self.timeout_handler = handler
 
+    def set_connection_handler(self, handler):
+        """
+        Sets a new connection handler. \n
+        @param handler : the new connection handler (see L{_default_connection_handler} for an example)
+                It will be called by the receiving thread whenever the connection to the server is lost
+                or restored.
+        @type handler : function
+        @return: B{None}
+        @rtype: NoneType
+        """
+        self.connection_handler = handler
+
+    def _default_connection_handler(self, state, indi):
+        """
+        Called whenever the connection to the server is lost or restored.
+        May be replaced by a custom one see L{set_connection_handler}
+        @param state: C{"disconnected"} or C{"connected"}
+        @type state: StringType
+        @param indi : This parameter will be equal to self.
+        @type indi : L{indiclient}
+        @return: B{None}
+        @rtype: NoneType
+        """
+        log.info("Connection to %s:%d %s" % (indi.host, indi.port, state))
+
     def set_def_handlers(self, blob_def_handler, number_def_handler,
                          switch_def_handler, text_def_handler, light_def_handler):
         """
@@ -2300,7 +3270,6 @@ class bigindiclient(object):
         @return: B{None}
         @rtype: NoneType
         """
-        self.process_receive_vector_queue()
         try:
             while self.receive_event_queue.empty() is False:
                 vector = self.receive_event_queue.get()
@@ -2314,11 +3283,8 @@ class bigindiclient(object):
                         self._vector_received(vector)
                         for element in vector.elements:
                             self._element_received(vector, element)
-                    if vector.tag.get_transfertype() == inditransfertypes.idef:
-                        for vec in self.defvectorlist:
-                            if (vec.name == vector.name) and (vec.device == vector.device):
-                                self.output_block = False
-                                return
+                    if (vector.tag.get_transfertype() == inditransfertypes.idef and
+                            (vector.device, vector.name) not in self.defvectors):
                         if vector.tag.get_type() == "BLOBVector":
                             self.blob_def_handler(vector, self)
                         if vector.tag.get_type() == "TextVector":
@@ -2329,7 +3295,7 @@ class bigindiclient(object):
                             self.switch_def_handler(vector, self)
                         if vector.tag.get_type() == "LightVector":
                             self.light_def_handler(vector, self)
-                        self.defvectorlist.append(vector)
+                        self.defvectors.add((vector.device, vector.name))
                 else:
                     log.warning("Received bogus INDIVector")
                     try:
@@ -2346,86 +3312,6 @@ class bigindiclient(object):
             self.quit()
             raise Exception("indiclient: Error during process events: {e}")
 
-    def _receive(self):
-        """receive data from the server
-        @return: B{None}
-        @rtype: NoneType
-        """
-        try:
-            data = self.socket.recv(1000000)
-        except Exception:
-            data = ""
-        if data != "":
-            if self.verbose:
-                log.debug(data)
-            parseval = self.expat.Parse(data, 0)
-        else:
-            parseval = None
-        return parseval
-
-    def _char_data(self, data):
-        """Char data handler for expat parser. For details (see
-        U{http://www.python.org/doc/current/lib/expat-example.html})
-        @param data: The data contained in the INDI element
-        @type data: StringType
-        @return: B{None}
-        @rtype: NoneType
-        """
-        if self.currentElement is None:
-            return None
-        if self.currentVector is None:
-            return None
-        self.currentData += data
-
-    def _end_element(self, name):
-        """End of XML element handler for expat parser. For details (see
-        U{http://www.python.org/doc/current/lib/expat-example.html})
-        @param name : The name of the XML object
-        @type name : StringType
-        @return: B{None}
-        @rtype: NoneType
-        """
-        if self.currentVector is None:
-            return None
-        self.currentVector.host = self.host
-        self.currentVector.port = self.port
-        if self.currentElement is not None:
-            if self.currentElement.tag.get_initial_tag() == name:
-                string_currentData = "".join(self.currentData).replace('\\n', '').strip()
-                self.currentElement._set_value(string_currentData)
-                self.currentVector.elements.append(self.currentElement)
-                self.currentElement = None
-                self.currentData = None
-        if self.currentVector.tag.get_initial_tag() == name:
-            self.receive_event_queue.put(self.currentVector)
-            self.receive_vector_queue.put(self.currentVector)
-            self.currentVector = None
-
-    def _start_element(self, name, attrs):
-        """
-        Start XML element handler for expat parser. For details (see
-        U{http://www.python.org/doc/current/lib/expat-example.html})
-        @param name : The name of the XML object
-        @type name : StringType
-        @param attrs : The attributes of the XML object
-        @type attrs : DictType
-        @return: B{None}
-        @rtype: NoneType
-        """
-        obj = self._factory.create(name, attrs)
-        if obj is None:
-            return
-        if 'message' in attrs:
-            self.receive_event_queue.put(indimessage(attrs))
-        if obj.tag.is_vector():
-            if obj.tag.get_transfertype() in (inditransfertypes.idef, inditransfertypes.iset):
-                self.currentVector = obj
-        if self.currentVector is not None:
-            if obj.tag.is_element():
-                if self.currentVector.tag.get_transfertype() in (inditransfertypes.idef, inditransfertypes.iset):
-                    self.currentElement = obj
-        self.currentData = []
-
     def enable_blob(self):
         """
         Sends a signal to the server that tells it, that this client wants to receive L{indiblob} objects.
@@ -2434,15 +3320,14 @@ class bigindiclient(object):
         @return: B{None}
         @rtype: NoneType
         """
-        data = "<enableBLOB>Also</enableBLOB>\n"
-        self.socket.send(data.encode("utf8"))
+        self.connection.enable_blob(self.devicename)
 
 
 class indiclient(bigindiclient):
     """providing a simplified interface to L{bigindiclient}"""
 
-    def __init__(self, host, port):
-        bigindiclient.__init__(self, host, port)
+    def __init__(self, host, port, devicename=None, shared=True):
+        bigindiclient.__init__(self, host, port, devicename, shared)
 
     def set_and_send_text(self, devicename, vectorname, elementname, text):
         """
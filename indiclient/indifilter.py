@@ -25,7 +25,7 @@ class FILTERWheel(indiclient):
     filters, filter name, etc.
     """
     def __init__(self, host, port, driver="Filter Simulator", debug=True):
-        super(FILTERWheel, self).__init__(host, port)
+        super(FILTERWheel, self).__init__(host, port, devicename=driver)
         self.filter_name = "Filter Default"
         self.driver = driver
         self.debug = debug
@@ -35,8 +35,8 @@ class FILTERWheel(indiclient):
 
         # run this to clear any queued events
         self.process_events()
-        self.defvectorlist = []
-        self.vector_dict = {v.name: v for v in self.indivectors.list}
+        self.defvectors.clear()
+        self.vector_dict = {v.name: v for v in self.indivectors.list if v.device == self.driver}
 
     @property
     def connected(self):
@@ -0,0 +1,110 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+Classes and utility functions for communicating with focusers via the INDI protocol, http://www.indilib.org.
+"""
+
+import time
+
+import logging
+import logging.handlers
+
+from .indiclient import indiclient
+
+log = logging.getLogger("")
+log.setLevel(logging.INFO)
+
+
+class Focuser(indiclient):
+    """
+    Wrap indiclient.indiclient with some focuser-specific utility functions to simplify things like moving
+    to an absolute position and waiting for the move to complete.
+    """
+    def __init__(self, host, port, driver="Focuser Simulator", debug=True):
+        super(Focuser, self).__init__(host, port, devicename=driver)
+        self.focuser_name = "Focuser Default"
+        self.driver = driver
+        self.debug = debug
+        # seconds allowed for a move
+        self.move_timeout = 60.0
+        if not self.connected:
+            self.connect()
+            time.sleep(2)
+
+        # run this to clear any queued events
+        self.process_events()
+        self.defvectors.clear()
+        self.vector_dict = {v.name: v for v in self.indivectors.list if v.device == self.driver}
+
+    @property
+    def connected(self):
+        """
+        Check connection status and return True if connected, False otherwise.
+        """
+        status = self.get_text(self.driver, "CONNECTION", "CONNECT")
+        if status == 'On':
+            return True
+        else:
+            return False
+
+    def connect(self):
+        """
+        Enable focuser connection
+        """
+        vec = self.set_and_send_switchvector_by_elementlabel(self.driver, "CONNECTION", "Connect")
+        if self.debug and vec is not None:
+            vec.tell()
+        self.process_events()
+        return vec
+
+    def disconnect(self):
+        """
+        Disable focuser connection
+        """
+        vec = self.set_and_send_switchvector_by_elementlabel(self.driver, "CONNECTION", "Disconnect")
+        if self.debug:
+            vec.tell()
+        return vec
+
+    @property
+    def position(self):
+        """
+        Return the absolute position of the focuser, in steps
+        """
+        return int(self.get_float(self.driver, "ABS_FOCUS_POSITION", "FOCUS_ABSOLUTE_POSITION"))
+
+    @position.setter
+    def position(self, pos):
+        """
+        Move the focuser to an absolute position and wait until it gets there
+        """
+        self.move(pos)
+
+    @property
+    def limits(self):
+        """
+        Return the (min, max) absolute positions of the focuser
+        """
+        e = self.get_element(self.driver, "ABS_FOCUS_POSITION", "FOCUS_ABSOLUTE_POSITION")
+        return int(e.get_min()), int(e.get_max())
+
+    def move(self, pos):
+        """
+        Move the focuser to an absolute position, returns once the driver reports the move done (Alpaca compatibility)
+        """
+        vmin, vmax = self.limits
+        pos = min(max(int(pos), vmin), vmax)
+        vec = self.set_and_send_float(self.driver, "ABS_FOCUS_POSITION", "FOCUS_ABSOLUTE_POSITION", pos)
+        if self.debug:
+            vec.tell()
+        vec.wait_for_ok_timeout(self.move_timeout)
+        return pos
+
+    def halt(self):
+        """
+        Stop the focuser (Alpaca compatibility)
+        """
+        vec = self.set_and_send_bool(self.driver, "FOCUS_ABORT_MOTION", "ABORT", True)
+        self.process_events()
+        return vec
@@ -7,6 +7,10 @@ Classes and utility functions for communicating with mount a the INDI protocol,
 
 import time
 import io
+import math
+import threading
+
+from concurrent.futures import Future
 
 import logging
 import logging.handlers
@@ -25,7 +29,7 @@ class Telescope(indiclient):
     mount, etc.
     """
     def __init__(self, host, port, driver="Mount Simulator", debug=True):
-        super(Telescope, self).__init__(host, port)
+        super(Telescope, self).__init__(host, port, devicename=driver)
         self.mount_name = "Mount Default"
         self.driver = driver
         self.debug = debug
@@ -35,8 +39,8 @@ class Telescope(indiclient):
 
         # run this to clear any queued events
         self.process_events()
-        self.defvectorlist = []
-        self.vector_dict = {v.name: v for v in self.indivectors.list}
+        self.defvectors.clear()
+        self.vector_dict = {v.name: v for v in self.indivectors.list if v.device == self.driver}
 
     @property
     def connected(self):
@@ -306,12 +310,87 @@ class Telescope(indiclient):
         if ra >= 0 and ra < 24:
             if dec >= -90 and dec <=90:
                 self.tracking                  
-                self.on_coord_set = 'Slew'
-                sra = str(ra)
-                self.set_and_send_text(self.driver, 'EQUATORIAL_EOD_COORD', 'RA', sra)
-                sdec = str(dec)
-                self.set_and_send_text(self.driver, 'EQUATORIAL_EOD_COORD', 'DEC', sdec)    
+                # RA and DEC go out as one newNumberVector, together with the slew mode
+                with self.batch():
+                    self.on_coord_set = 'Slew'
+                    sra = str(ra)
+                    self.set_and_send_text(self.driver, 'EQUATORIAL_EOD_COORD', 'RA', sra)
+                    sdec = str(dec)
+                    self.set_and_send_text(self.driver, 'EQUATORIAL_EOD_COORD', 'DEC', sdec)    
         self.on_coord_set = 'Track'
+
+    def slew(self, ra, dec, tolerance=5.0, timeout=300.0, settle=0.0):
+        """
+        Slew the telescope to the coordinates without waiting, return a concurrent.futures.Future of the
+        (ra, dec) reached. It completes when EQUATORIAL_EOD_COORD turns Ok with the coordinates within
+        tolerance of the target for settle seconds, and fails on Alert or timeout, the motion being aborted
+        on timeout. Cancelling the future aborts the slew.
+        ra (float): HH.HHHHHH
+        dec (float): DD.DDDDDD
+        tolerance (float): arcseconds
+        timeout (float): seconds
+        settle (float): seconds
+        """
+        future = Future()
+        if not (0 <= ra < 24 and -90 <= dec <= 90):
+            future.set_exception(Exception("Coordinates out of range RA=" + str(ra) + " DEC=" + str(dec)))
+            return future
+        vec = self.get_vector(self.driver, "EQUATORIAL_EOD_COORD")
+        self.slewtocoordinates(ra, dec)
+        future.add_done_callback(self._slew_done)
+        thread = threading.Thread(target=self._follow_slew, args=(future, vec, ra, dec, tolerance, timeout, settle),
+                                  daemon=True)
+        thread.start()
+        return future
+
+    def _slew_done(self, future):
+        if future.cancelled():
+            self.abort
+
+    def _separation(self, vec, ra, dec):
+        """
+        Return the distance in arcseconds between the coordinates of vec and ra, dec
+        """
+        vra = vec.get_element("RA").get_float()
+        vdec = vec.get_element("DEC").get_float()
+        # RA difference through 0h/24h
+        dra = ((vra - ra + 12) % 24 - 12) * 54000.0 * math.cos(math.radians(dec))
+        return math.hypot(dra, (vdec - dec) * 3600.0), vra, vdec
+
+    def _follow_slew(self, future, vec, ra, dec, tolerance, timeout, settle):
+        """
+        Wait for the slew started by slew, the updates of EQUATORIAL_EOD_COORD wake it up
+        """
+        t = time.time()
+        settled = None
+        count = vec.get_update_count()
+        try:
+            while not future.done():
+                light = vec.get_light()
+                if light.is_alert():
+                    raise Exception("Slew failed, EQUATORIAL_EOD_COORD is Alert")
+                distance, vra, vdec = self._separation(vec, ra, dec)
+                now = time.time()
+                if light.is_ok() and distance <= tolerance:
+                    if settled is None:
+                        settled = now
+                    if now - settled >= settle:
+                        future.set_result((vra, vdec))
+                        break
+                else:
+                    settled = None
+                remaining = timeout - (now - t)
+                if remaining <= 0:
+                    self.abort
+                    raise Exception("Slew timeout after " + str(timeout) + " s, " + str(round(distance, 1)) +
+                                    " arcsec from the target")
+                wait = remaining if settled is None else min(remaining, settled + settle - now)
+                # a short wait, so a cancelled future does not keep the thread
+                if vec.wait_for_update(count, min(wait, 1.0)):
+                    count = vec.get_update_count()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
                   
     @property
     def telescope_track_mode(self):
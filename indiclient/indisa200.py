@@ -24,7 +24,7 @@ class SA200Motor(indiclient):
     filters, filter name, etc.
     """
     def __init__(self, host, port, driver="SA200", debug=True):
-        super(SA200Motor, self).__init__(host, port)
+        super(SA200Motor, self).__init__(host, port, devicename=driver)
         self.filter_name = "SA200"
         self.driver = driver
         self.debug = debug
@@ -34,8 +34,8 @@ class SA200Motor(indiclient):
 
         # run this to clear any queued events
         self.process_events()
-        self.defvectorlist = []
-        self.vector_dict = {v.name: v for v in self.indivectors.list}      
+        self.defvectors.clear()
+        self.vector_dict = {v.name: v for v in self.indivectors.list if v.device == self.driver}      
 
     @property
     def initialization(self):
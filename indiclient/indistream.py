@@ -0,0 +1,211 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+Classes for receiving the video stream of INDI cameras, http://www.indilib.org.
+The frames are kept in a preallocated ring buffer and can be spooled to a SER file or a FITS cube.
+"""
+
+import time
+import struct
+import threading
+
+import logging
+import logging.handlers
+
+import numpy as np
+
+from astropy.io import fits
+
+log = logging.getLogger("")
+log.setLevel(logging.INFO)
+
+
+class FrameRing(object):
+    """
+    A ring buffer of the last frames of a stream. It is allocated once, with the shape of the first frame,
+    and the oldest frame is overwritten when it is full.
+    Iterating over it yields (index, timestamp, frame) until the stream is stopped, skipping the frames
+    that have been overwritten before they could be read. The frames yielded are views on the buffer,
+    they have to be copied to be kept longer than size - 1 more frames.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.frames = None
+        self.timestamps = np.zeros(size)
+        # frames put so far
+        self.count = 0
+        # frames missed by the stream thread, and frames overwritten before an iterator read them
+        self.dropped = 0
+        self.overrun = 0
+        self.closed = False
+        self._changed = threading.Condition()
+
+    def put(self, frame, timestamp):
+        """
+        Copy a frame into the buffer in place of the oldest one, return its index
+        """
+        if self.frames is None or self.frames.shape[1:] != frame.shape or self.frames.dtype != frame.dtype:
+            self.frames = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+        slot = self.count % self.size
+        self.frames[slot] = frame
+        self.timestamps[slot] = timestamp
+        with self._changed:
+            self.count += 1
+            self._changed.notify_all()
+        return self.count - 1
+
+    def get(self, index):
+        """
+        Return the frame with the given index, None if it has been overwritten or not received yet
+        """
+        if index < 0 or index >= self.count or index < self.count - self.size:
+            return None
+        return self.frames[index % self.size]
+
+    def latest(self):
+        """
+        Return (index, timestamp, frame) of the last frame received, None if there is none yet
+        """
+        index = self.count - 1
+        if index < 0:
+            return None
+        return index, self.timestamps[index % self.size], self.frames[index % self.size]
+
+    def wait(self, index, timeout=None):
+        """
+        Wait until the frame with the given index has been received, return False on timeout or
+        if the stream has been stopped before
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self.count > index or self.closed, timeout) and self.count > index
+
+    def close(self):
+        """
+        Mark the end of the stream, wakes up the iterators
+        """
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    def __iter__(self):
+        index = max(0, self.count - self.size)
+        while self.wait(index):
+            if index < self.count - self.size:
+                # drop oldest, resume from the oldest frame still there
+                self.overrun += self.count - self.size - index
+                index = self.count - self.size
+            slot = index % self.size
+            yield index, self.timestamps[slot], self.frames[slot]
+            index += 1
+
+
+class SERWriter(object):
+    """
+    Spool the frames of a stream into a SER file, the format used by lucky imaging software.
+    The header is written with the first frame and completed by close, which also appends the timestamps.
+    """
+    def __init__(self, file_name, observer="", instrument="", telescope=""):
+        self.file_name = file_name
+        self.observer = observer
+        self.instrument = instrument
+        self.telescope = telescope
+        self.file = open(file_name, 'wb', buffering=1048576)
+        self.header = None
+        self.timestamps = []
+
+    def _ticks(self, timestamp):
+        """
+        Convert a unix time into the SER time, 100 ns ticks since 0001-01-01
+        """
+        return int(timestamp * 10000000) + 621355968000000000
+
+    def _pack_header(self):
+        return struct.pack("<14s7i40s40s40sqq", b"LUCAM-RECORDER", 0, self.header['color'],
+                           # 0 is read as little endian by all the usual SER readers
+                           0, self.header['width'], self.header['height'], self.header['depth'],
+                           len(self.timestamps), self.observer.encode()[:40], self.instrument.encode()[:40],
+                           self.telescope.encode()[:40], self.header['date'], self.header['date'])
+
+    def write(self, frame, timestamp):
+        """
+        Append a frame, 8 or 16 bit, mono or RGB
+        """
+        if self.header is None:
+            self.header = {
+                'color': 100 if frame.ndim == 3 else 0,
+                'width': frame.shape[1],
+                'height': frame.shape[0],
+                'depth': 8 * frame.dtype.itemsize,
+                'date': self._ticks(timestamp)
+            }
+            self.file.write(self._pack_header())
+        self.file.write(np.ascontiguousarray(frame, dtype=frame.dtype.newbyteorder('<')).data)
+        self.timestamps.append(self._ticks(timestamp))
+
+    def close(self):
+        """
+        Append the timestamps and write the frame count into the header
+        """
+        if self.header is not None:
+            self.file.write(np.array(self.timestamps, dtype='<i8').data)
+            self.file.seek(0)
+            self.file.write(self._pack_header())
+        self.file.close()
+
+
+class FITSCubeWriter(object):
+    """
+    Spool the frames of a stream into a FITS cube, one plane per frame. Only mono frames are supported.
+    The header is written with the first frame and NAXIS3 is set by close.
+    """
+    def __init__(self, file_name, header=None):
+        self.file_name = file_name
+        self.file = open(file_name, 'wb', buffering=1048576)
+        self.extra = header
+        self.header = None
+        self.frames = 0
+        self.size = 0
+
+    def write(self, frame, timestamp):
+        """
+        Append a frame, 8 or 16 bit mono
+        """
+        if frame.ndim != 2:
+            raise Exception("Only mono frames can be written to a FITS cube.")
+        if self.header is None:
+            hdr = fits.Header()
+            hdr['SIMPLE'] = True
+            hdr['BITPIX'] = 8 * frame.dtype.itemsize
+            hdr['NAXIS'] = 3
+            hdr['NAXIS1'] = frame.shape[1]
+            hdr['NAXIS2'] = frame.shape[0]
+            hdr['NAXIS3'] = 0
+            if frame.dtype.itemsize == 2:
+                hdr['BZERO'] = 32768
+                hdr['BSCALE'] = 1
+            hdr['DATE-OBS'] = (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)), 'UTC date of the first frame')
+            if self.extra is not None:
+                hdr.extend(self.extra, update=True)
+            self.header = hdr
+            self.file.write(hdr.tostring().encode('ascii'))
+        if frame.dtype.itemsize == 2:
+            # FITS stores signed big endian integers, BZERO brings them back to unsigned
+            data = (frame ^ np.uint16(0x8000)).astype('>u2')
+        else:
+            data = frame
+        data = np.ascontiguousarray(data)
+        self.file.write(data.data)
+        self.size += data.nbytes
+        self.frames += 1
+
+    def close(self):
+        """
+        Pad the data to a whole FITS block and write the number of frames into the header
+        """
+        if self.header is not None:
+            self.file.write(b"\0" * (-self.size % 2880))
+            self.header['NAXIS3'] = self.frames
+            self.file.seek(0)
+            self.file.write(self.header.tostring().encode('ascii'))
+        self.file.close()
@@ -0,0 +1,219 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+Classes for recording the telemetry of mounts via the INDI protocol, http://www.indilib.org.
+"""
+
+import time
+import threading
+
+import logging
+import logging.handlers
+
+import numpy as np
+
+from .indiclient import indi_custom_vector_handler
+
+log = logging.getLogger("")
+log.setLevel(logging.INFO)
+
+telemetry_dtype = np.dtype([
+    ('time', '<f8'),        # unix time of the sample, from the INDI timestamp when there is one
+    ('ra', '<f8'),          # hours
+    ('dec', '<f8'),         # degrees
+    ('pier', 'i1'),         # 0 east, 1 west, -1 unknown
+    ('tracking', 'i1'),     # 1 on, 0 off, -1 unknown
+    ('track_mode', 'i1'),   # index of the TELESCOPE_TRACK_MODE switch on, -1 unknown
+    ('motion_ns', 'i1'),    # 1 north, -1 south, 0 none
+    ('motion_we', 'i1'),    # 1 west, -1 east, 0 none
+])
+"""The record of a telemetry sample, as kept in memory and written by L{TelemetryRecorder.dump}"""
+
+
+class _telemetry_handler(indi_custom_vector_handler):
+    """
+    Hands each update of a vector over to the recorder
+    """
+    def __init__(self, recorder, devicename, vectorname):
+        indi_custom_vector_handler.__init__(self, devicename, vectorname)
+        self.recorder = recorder
+        self.updates = None
+
+    def on_indiobject_changed(self, vector):
+        # process_events may hand the same update over more than once
+        updates = vector.get_update_count()
+        if updates != self.updates:
+            self.updates = updates
+            self.recorder._record(vector)
+
+
+class TelemetryRecorder(object):
+    """
+    Record the position and state of a mount into a ring buffer of numpy records, a sample per update of
+    EQUATORIAL_EOD_COORD carrying the last pier side, tracking state, track mode and motion received.
+    The updates reach the recorder through custom vector handlers, so they are recorded by the
+    process_events calls of the telescope, or by the thread of start.
+    """
+
+    # the state first, so the first sample already carries it
+    vectors = ("TELESCOPE_PIER_SIDE", "TELESCOPE_TRACK_STATE", "TELESCOPE_TRACK_MODE",
+               "TELESCOPE_MOTION_NS", "TELESCOPE_MOTION_WE", "EQUATORIAL_EOD_COORD")
+
+    def __init__(self, telescope, size=86400):
+        """
+        telescope: the Telescope client of the mount
+        size: the number of samples kept, the oldest ones are overwritten
+        """
+        self.telescope = telescope
+        self.size = size
+        self.samples = np.zeros(size, dtype=telemetry_dtype)
+        self.count = 0
+        self._state = np.zeros(1, dtype=telemetry_dtype)[0]
+        for name in ('pier', 'tracking', 'track_mode'):
+            self._state[name] = -1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.handlers = []
+        for name in self.vectors:
+            if name in telescope.vector_dict:
+                self.handlers.append(telescope.add_custom_vector_handler(
+                    _telemetry_handler(self, telescope.driver, name)))
+
+    def _time(self, vector):
+        """
+        Return the unix time of an update, from its INDI timestamp (UTC) if there is one
+        """
+        if vector.timestamp:
+            try:
+                return (np.datetime64(vector.timestamp, 'us') - np.datetime64(0, 'us')) / np.timedelta64(1, 's')
+            except ValueError:
+                pass
+        return time.time()
+
+    def _record(self, vector):
+        """
+        Update the state from a vector received, append a sample for coordinates
+        """
+        state = self._state
+        name = vector.name
+        if name == "EQUATORIAL_EOD_COORD":
+            with self._lock:
+                slot = self.count % self.size
+                self.samples[slot] = state
+                self.samples[slot]['time'] = self._time(vector)
+                self.samples[slot]['ra'] = vector.get_element("RA").get_float()
+                self.samples[slot]['dec'] = vector.get_element("DEC").get_float()
+                self.count += 1
+        elif name == "TELESCOPE_PIER_SIDE":
+            state['pier'] = 1 if vector.get_element("PIER_WEST").get_active() else 0
+        elif name == "TELESCOPE_TRACK_STATE":
+            state['tracking'] = 1 if vector.get_element("TRACK_ON").get_active() else 0
+        elif name == "TELESCOPE_TRACK_MODE":
+            state['track_mode'] = vector.get_active_index()
+        elif name == "TELESCOPE_MOTION_NS":
+            state['motion_ns'] = int(vector.get_element("MOTION_NORTH").get_active()) - \
+                int(vector.get_element("MOTION_SOUTH").get_active())
+        elif name == "TELESCOPE_MOTION_WE":
+            state['motion_we'] = int(vector.get_element("MOTION_WEST").get_active()) - \
+                int(vector.get_element("MOTION_EAST").get_active())
+
+    def start(self, interval=0.1):
+        """
+        Record in the background, process_events of the telescope is called every interval seconds
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.telescope.process_events()
+            except Exception:
+                log.exception("Telemetry recording failed.")
+
+    def stop(self):
+        """
+        Stop recording in the background
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """
+        Stop recording and remove the handlers from the telescope
+        """
+        self.stop()
+        for handler in self.handlers:
+            key = (handler.devicename, handler.vectorname)
+            handlers = self.telescope.custom_vector_handlers.get(key, [])
+            if handler in handlers:
+                handlers.remove(handler)
+        self.handlers = []
+
+    def data(self, window=None):
+        """
+        Return a copy of the samples in chronological order, only those of the last window seconds if given
+        """
+        with self._lock:
+            n = min(self.count, self.size)
+            start = self.count % self.size if self.count > self.size else 0
+            data = np.concatenate((self.samples[start:n], self.samples[:start]))
+        if window is not None and len(data) > 0:
+            data = data[data['time'] >= data['time'][-1] - window]
+        return data
+
+    def _fit(self, window):
+        """
+        Return the times, the RA and Dec positions in arcseconds on the sky and their linear fit over a window
+        """
+        data = self.data(window)
+        if len(data) < 2:
+            return None
+        t = data['time'] - data['time'][0]
+        # RA unwrapped through 0h/24h, and scaled by cos(dec) to arcseconds on the sky
+        ra = np.unwrap(data['ra'] * (np.pi / 12)) * (12 / np.pi)
+        pos = np.column_stack((ra * 54000.0 * np.cos(np.radians(data['dec'])), data['dec'] * 3600.0))
+        coeffs = np.polyfit(t, pos, 1)
+        return t, pos, coeffs
+
+    def drift(self, window=None):
+        """
+        Return the drift rates (RA, Dec) in arcseconds per second over the last window seconds, None without samples
+        """
+        fit = self._fit(window)
+        if fit is None:
+            return None
+        return float(fit[2][0][0]), float(fit[2][0][1])
+
+    def residual_rms(self, window=None):
+        """
+        Return the RMS (RA, Dec, total) in arcseconds of the positions about their linear drift
+        over the last window seconds, None without samples
+        """
+        fit = self._fit(window)
+        if fit is None:
+            return None
+        t, pos, coeffs = fit
+        residuals = pos - (np.outer(t, coeffs[0]) + coeffs[1])
+        rms = np.sqrt(np.mean(residuals ** 2, axis=0))
+        return float(rms[0]), float(rms[1]), float(np.hypot(rms[0], rms[1]))
+
+    def dump(self, file_name, window=None):
+        """
+        Write the samples to a binary .npy file, read back with TelemetryRecorder.load
+        """
+        np.save(file_name, self.data(window), allow_pickle=False)
+
+    @staticmethod
+    def load(file_name):
+        """
+        Return the samples written by dump
+        """
+        return np.load(file_name, allow_pickle=False)
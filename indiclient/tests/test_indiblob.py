@@ -0,0 +1,77 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+Regression tests for the decoding of BLOBs while they are received.
+"""
+
+import asyncio
+import base64
+import os
+
+from ..indiclient import _indiparser, _indiblobdecoder
+from ..asyncindiclient import asyncindiclient
+
+BLOB_SIZE = 3 * 1024 * 1024
+CLIENTS = 4
+
+
+def _setblob(data):
+    encoded = base64.b64encode(data).decode()
+    lines = "\n".join(encoded[i:i + 72] for i in range(0, len(encoded), 72))
+    return ('<setBLOBVector device="Dev" name="CCD1" state="Ok">'
+            '<oneBLOB name="CCD1" size="%d" format=".fits">%s</oneBLOB></setBLOBVector>' % (len(data), lines)).encode()
+
+
+def test_parsers_have_their_own_decoder():
+    # a parser never waits for a worker busy with the BLOB of another connection
+    assert _indiparser().blob_pool is not _indiparser().blob_pool
+
+
+def test_decoder_handoff_does_not_block():
+    # the receiving thread hands over fragments without waiting, however far behind the worker is
+    parser = _indiparser()
+    data = os.urandom(BLOB_SIZE)
+    decoder = _indiblobdecoder(len(data), False, parser.blob_pool)
+    encoded = base64.b64encode(data).decode()
+    for i in range(0, len(encoded), 4096):
+        decoder.feed(encoded[i:i + 4096])
+    assert bytes(decoder.finish()) == data
+
+
+def test_async_clients_more_blobs_than_workers():
+    # more BLOBs in flight on one event loop than the workers of the former shared pool
+    blobs = [os.urandom(BLOB_SIZE) for i in range(CLIENTS)]
+
+    async def serve(reader, writer):
+        await reader.readuntil(b"/>")
+        data = _setblob(blobs[int((await reader.readline()).strip())])
+        # interleave the BLOBs of all the clients
+        for i in range(0, len(data), 65536):
+            writer.write(data[i:i + 65536])
+            await writer.drain()
+            await asyncio.sleep(0)
+        writer.close()
+
+    async def receive(client, index):
+        await client._send("%d\n" % index)
+        async for vector in client.updates("Dev", "CCD1"):
+            return bytes(vector.elements[0].get_data())
+
+    async def main():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        clients = [asyncindiclient("127.0.0.1", port) for i in range(CLIENTS)]
+        for client in clients:
+            client.blob_pool_size = 0
+            await client.connect()
+        try:
+            received = await asyncio.wait_for(
+                asyncio.gather(*[receive(client, i) for i, client in enumerate(clients)]), 30)
+        finally:
+            for client in clients:
+                await client.quit()
+            server.close()
+        return received
+
+    assert asyncio.run(main()) == blobs
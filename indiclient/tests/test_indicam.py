@@ -0,0 +1,110 @@
+# Licensed under GPL3 (see LICENSE)
+# coding=utf-8
+
+"""
+Tests of CCDCam against a fake INDI server with a CCD and no filter wheel.
+"""
+
+import base64
+import io
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from astropy.io import fits
+
+from ..indicam import CCDCam
+
+DEFS = b"""<defSwitchVector device="CCD" name="CONNECTION" label="Connection" group="Main" state="Idle" perm="rw" rule="OneOfMany" timeout="60">
+<defSwitch name="CONNECT" label="Connect">On</defSwitch>
+<defSwitch name="DISCONNECT" label="Disconnect">Off</defSwitch>
+</defSwitchVector>
+<defNumberVector device="CCD" name="CCD_EXPOSURE" label="Exposure" group="Main" state="Idle" perm="rw" timeout="60">
+<defNumber name="CCD_EXPOSURE_VALUE" label="Duration" format="%5.2f" min="0" max="3600" step="1">0</defNumber>
+</defNumberVector>
+<defSwitchVector device="CCD" name="CCD_FRAME_TYPE" label="Type" group="Main" state="Idle" perm="rw" rule="OneOfMany" timeout="60">
+<defSwitch name="FRAME_LIGHT" label="Light">On</defSwitch>
+<defSwitch name="FRAME_BIAS" label="Bias">Off</defSwitch>
+<defSwitch name="FRAME_DARK" label="Dark">Off</defSwitch>
+<defSwitch name="FRAME_FLAT" label="Flat">Off</defSwitch>
+</defSwitchVector>
+<defBLOBVector device="CCD" name="CCD1" label="Image" group="Main" state="Idle" perm="ro" timeout="60">
+<defBLOB name="CCD1" label="Image"/>
+</defBLOBVector>
+"""
+
+
+class FakeCCDServer(object):
+    """
+    An INDI server with a CCD without filter wheel, each exposure is answered with the image given
+    """
+    def __init__(self, image):
+        self.image = image
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self.socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            if b"getProperties" in data:
+                conn.sendall(DEFS)
+            if b"newNumberVector" in data and b"CCD_EXPOSURE" in data:
+                enc = base64.b64encode(self.image)
+                conn.sendall(b'<setNumberVector device="CCD" name="CCD_EXPOSURE" state="Ok">'
+                             b'<oneNumber name="CCD_EXPOSURE_VALUE">0</oneNumber></setNumberVector>'
+                             b'<setBLOBVector device="CCD" name="CCD1" state="Ok"><oneBLOB name="CCD1" size="%d" '
+                             b'format=".fits">%s</oneBLOB></setBLOBVector>' % (len(self.image), enc))
+
+    def close(self):
+        self.socket.close()
+
+
+def _image(filter_name=None):
+    hdu = fits.PrimaryHDU(np.arange(64, dtype=np.uint16).reshape(8, 8))
+    if filter_name is not None:
+        hdu.header['FILTER'] = filter_name
+    buf = io.BytesIO()
+    hdu.writeto(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture(params=[None, 'Ha'], ids=['nofilter', 'filter'])
+def camera(request):
+    server = FakeCCDServer(_image(request.param))
+    cam = CCDCam("127.0.0.1", server.port, driver="CCD", debug=False)
+    cam.filter_card = request.param
+    yield cam
+    cam.quit()
+    server.close()
+
+
+def test_expose_without_filter_wheel(camera):
+    hdul = camera.expose(0.0)
+    assert hdul is not None
+    assert hdul[0].data.shape == (8, 8)
+    assert hdul[0].header.get('FILTER') == camera.filter_card
+
+
+def test_sequence_without_filter_wheel(camera):
+    received = []
+    frames = camera.sequence(3, 0.0, callback=lambda index, hdul: received.append(index))
+    assert sorted(received) == [0, 1, 2]
+    assert [f[0].header.get('FILTER') for f in frames] == [camera.filter_card] * 3
@@ -0,0 +1,110 @@
+"""Microbenchmark of the line framing of _Conn.ReadLine
+
+Replays a PHD2 event stream through a local socket and reads it back line by line.
+The stream is read from a file recorded from the PHD2 event server (for example
+with: nc localhost 4400 > events.txt), or generated if no file is given.
+
+    python -m ciboulette.phd2client.benchmark [events.txt] [repeat]
+"""
+
+import json
+import selectors
+import socket
+import sys
+import threading
+import time
+
+from .guider import _Conn
+
+
+def _events(count):
+    """a stream looking like PHD2 while guiding: mostly GuideStep, with Settling and Alert floods"""
+    lines = [json.dumps({"Event": "Version", "Timestamp": 1700000000.0, "Host": "pi", "Inst": 1,
+                         "PHDVersion": "2.6.11", "PHDSubver": "", "OverlapSupport": True, "MsgVersion": 1})]
+    for i in range(count):
+        t = 1700000000.0 + i
+        if i % 50 < 5:
+            ev = {"Event": "Settling", "Timestamp": t, "Host": "pi", "Inst": 1, "Distance": 0.42,
+                  "Time": i % 50, "SettleTime": 10, "StarLocked": True}
+        elif i % 200 == 100:
+            ev = {"Event": "Alert", "Timestamp": t, "Host": "pi", "Inst": 1,
+                  "Msg": "Star lost - low SNR", "Type": "warning"}
+        else:
+            ev = {"Event": "GuideStep", "Timestamp": t, "Host": "pi", "Inst": 1, "Frame": i, "Time": 2.0 * i,
+                  "Mount": "INDI Mount [Telescope Simulator]", "dx": 0.12, "dy": -0.31, "RADistanceRaw": 0.21,
+                  "DECDistanceRaw": -0.17, "RADistanceGuide": 0.14, "DECDistanceGuide": 0.0,
+                  "RADuration": 28, "RADirection": "East", "StarMass": 41234.5, "SNR": 52.31, "HFD": 2.41,
+                  "AvgDist": 0.27}
+        lines.append(json.dumps(ev))
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+class _LegacyConn(_Conn):
+    """the byte by byte framing ReadLine used before, kept for comparison"""
+
+    def ReadLine(self):
+        lines = self.legacy_lines
+        while not lines:
+            while True:
+                if self.terminate:
+                    return ''
+                if self.sel.select(0.5):
+                    break
+            s = self.sock.recv(4096)
+            if not s:
+                return ''
+            i0 = 0
+            i = i0
+            while i < len(s):
+                if s[i] == b'\r'[0] or s[i] == b'\n'[0]:
+                    self.legacy_buf += s[i0 : i]
+                    if self.legacy_buf:
+                        lines.append(self.legacy_buf)
+                        self.legacy_buf = b''
+                    i += 1
+                    i0 = i
+                else:
+                    i += 1
+            self.legacy_buf += s[i0 : i]
+        return lines.pop(0)
+
+
+def _replay(cls, data):
+    """send data through a socket pair and time reading it back with cls, return (seconds, lines)"""
+    a, b = socket.socketpair()
+    conn = cls()
+    conn.legacy_lines = []
+    conn.legacy_buf = b''
+    conn.sock = b
+    b.setblocking(False)
+    conn.sel = selectors.DefaultSelector()
+    conn.sel.register(b, selectors.EVENT_READ)
+    sender = threading.Thread(target=lambda: (a.sendall(data), a.shutdown(socket.SHUT_WR)))
+    t = time.perf_counter()
+    sender.start()
+    count = 0
+    while conn.ReadLine():
+        count += 1
+    seconds = time.perf_counter() - t
+    sender.join()
+    conn.Disconnect()
+    a.close()
+    return seconds, count
+
+
+def main(argv):
+    if len(argv) > 1:
+        with open(argv[1], 'rb') as f:
+            data = f.read()
+    else:
+        data = _events(100000)
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    print(f"stream: {len(data) / 1048576:.1f} MiB")
+    for name, cls in (("legacy", _LegacyConn), ("ReadLine", _Conn)):
+        seconds, count = min(_replay(cls, data) for _ in range(repeat))
+        print(f"{name:>8}: {count} lines in {seconds:.3f} s, {count / seconds:.0f} lines/s, "
+              f"{len(data) / seconds / 1048576:.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,5 +1,8 @@
+import concurrent.futures
 import copy
+import itertools
 import json
+from collections import deque
 import math
 import selectors
 import socket
@@ -61,9 +64,14 @@ class _Accum:
         return self.peak
 
 class _Conn:
+    RECV_SIZE = 65536
+
     def __init__(self):
-        self.lines = []
-        self.buf = b''
+        self.lines = deque()
+        # the end of the data received that is not a whole line yet
+        self.buf = bytearray()
+        self.rbuf = bytearray(self.RECV_SIZE)
+        self.rview = memoryview(self.rbuf)
         self.sock = None
         self.sel = None
         self.terminate = False
@@ -105,22 +113,24 @@ class _Conn:
                 if events:
                     break
             #print("DBG: call recv")
-            s = self.sock.recv(4096)
-            #print(f"DBG: recvd: {len(s)}: {s}")
-            i0 = 0
-            i = i0
-            while i < len(s):
-                if s[i] == b'\r'[0] or s[i] == b'\n'[0]:
-                    self.buf += s[i0 : i]
-                    if self.buf:
-                        self.lines.append(self.buf)
-                        self.buf = b''
-                    i += 1
-                    i0 = i
-                else:
-                    i += 1
-            self.buf += s[i0 : i]
-        return self.lines.pop(0)
+            n = self.sock.recv_into(self.rview)
+            #print(f"DBG: recvd: {n}")
+            if n == 0:
+                # server disconnected
+                return ''
+            self._Frame(self.rview[:n])
+        return self.lines.popleft()
+
+    def _Frame(self, data):
+        """append the data received and move the whole lines it completes to self.lines"""
+        buf = self.buf
+        buf += data
+        end = max(buf.rfind(b'\n'), buf.rfind(b'\r'))
+        if end < 0:
+            return
+        # splitlines breaks on \r, \n and \r\n only for bytes, empty lines are dropped
+        self.lines.extend(line for line in bytes(buf[:end]).splitlines() if line)
+        del buf[:end + 1]
 
     def WriteLine(self, s):
         b = s.encode()
@@ -138,6 +148,7 @@ class Guider:
     """The main class for interacting with PHD2"""
 
     DEFAULT_STOPCAPTURE_TIMEOUT = 10
+    DEFAULT_CALL_TIMEOUT = 60
 
     def __init__(self, hostname = "localhost", instance = 1):
         self.hostname = hostname
@@ -146,8 +157,12 @@ class Guider:
         self.terminate = False
         self.worker = None
         self.lock = threading.Lock()
-        self.cond = threading.Condition()
-        self.response = None
+        # requests sent and not answered yet, by JSON-RPC id
+        self.pending = {}
+        # True while the worker is there to answer the requests
+        self.accepting = False
+        self.ids = itertools.count(1)
+        self.wlock = threading.Lock()
         self.AppState = ''
         self.AvgDist = 0
         self.Version = ''
@@ -267,13 +282,29 @@ class Guider:
                 #print("DBG: ignoring invalid json response")
                 continue
             if "jsonrpc" in j:
-                # a response
+                # a response, to the request with the same id
                 #print(f"DBG: R: {line}\n")
-                with self.cond:
-                    self.response = j
-                    self.cond.notify()
+                with self.lock:
+                    if j.get("id") is None and "error" in j and self.pending:
+                        # PHD2 could not read the id of the request, it answers
+                        # in order so it is the oldest one still pending
+                        future = self.pending.pop(next(iter(self.pending)))
+                    else:
+                        future = self.pending.pop(j.get("id"), None)
+                if future is not None:
+                    future.set_result(j)
             else:
                 self._handle_event(j)
+        self._FailPending("disconnected from PHD2")
+
+    def _FailPending(self, msg):
+        with self.lock:
+            self.accepting = False
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(GuiderException(msg))
 
     def Connect(self):
         """connect to PHD2 -- call Connect before calling any of the server API methods below"""
@@ -282,6 +313,8 @@ class Guider:
             self.conn = _Conn()
             self.conn.Connect(self.hostname, 4400 + self.instance - 1)
             self.terminate = False
+            with self.lock:
+                self.accepting = True
             self.worker = threading.Thread(target=self._worker)
             self.worker.start()
             #print("DBG: connect done")
@@ -291,6 +324,8 @@ class Guider:
 
     def Disconnect(self):
         """disconnect from PHD2"""
+        with self.lock:
+            self.accepting = False
         if self.worker is not None:
             if self.worker.is_alive():
                 #print("DBG: terminating worker")
@@ -305,10 +340,10 @@ class Guider:
         #print("DBG: disconnect done")
 
     @staticmethod
-    def _make_jsonrpc(method, params):
+    def _make_jsonrpc(method, params, id = 1):
         req = {
             "method": method,
-            "id": 1
+            "id": id
         }
         if params is not None:
             if isinstance(params, (list, dict)):
@@ -322,22 +357,48 @@ class Guider:
     def _failed(res):
         return "error" in res
 
-    def Call(self, method, params = None):
-        """this function can be used for raw JSONRPC method
-        invocation. Generally you won't need to use this as it is much
-        more convenient to use the higher-level methods below
+    def CallAsync(self, method, params = None):
+        """send a raw JSONRPC request without waiting for the response.
+        Returns a concurrent.futures.Future of the response, several
+        requests can be in flight at the same time, they are matched to
+        their responses by id
 
         """
-        s = self._make_jsonrpc(method, params)
+        future = concurrent.futures.Future()
+        with self.lock:
+            if not self.accepting:
+                raise GuiderException("not connected to PHD2")
+            future.id = next(self.ids)
+            self.pending[future.id] = future
+        s = self._make_jsonrpc(method, params, future.id)
         #print(f"DBG: Call: {s}")
         # send request
-        self.conn.WriteLine(s + "\r\n")
+        try:
+            with self.wlock:
+                self.conn.WriteLine(s + "\r\n")
+        except Exception:
+            with self.lock:
+                self.pending.pop(future.id, None)
+            raise
+        return future
+
+    def Call(self, method, params = None, timeout = None):
+        """this function can be used for raw JSONRPC method
+        invocation. Generally you won't need to use this as it is much
+        more convenient to use the higher-level methods below.
+        timeout is in seconds, DEFAULT_CALL_TIMEOUT if None
+
+        """
+        if timeout is None:
+            timeout = self.DEFAULT_CALL_TIMEOUT
+        future = self.CallAsync(method, params)
         # wait for response
-        with self.cond:
-            while not self.response:
-                self.cond.wait()
-            response = self.response
-            self.response = None
+        try:
+            response = future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            with self.lock:
+                self.pending.pop(future.id, None)
+            raise GuiderException(f"no response to {method} after {timeout} seconds")
         if self._failed(response):
             raise GuiderException(response["error"]["message"])
         return response
@@ -0,0 +1,211 @@
+"""
+FitsWriter class
+"""
+
+import os
+import time
+import queue
+import shutil
+import threading
+from collections import deque
+from astropy.io import fits
+
+class FitsWriter(object):
+    """
+    Write fits files in the background, so a slow disk does not delay the next exposure
+    Files are written to a .part file next to their final name and renamed once complete,
+    a reader of the dataset never sees a partial file.
+    """
+
+    def __init__(self, maxsize=4, fsync=0, spool=None, buffering=1048576):
+        """
+         maxsize (int): Number of files waiting in memory before write waits or spills.
+         fsync (int): Number of files written before they are synced to disk together, 0 never syncs.
+         spool (str): Directory the files are spilled to when the queue is full, write waits if None.
+         buffering (int): Size of the write buffer in bytes.
+        """
+        self.maxsize = maxsize
+        self.fsync = fsync
+        self.spool = spool
+        self.buffering = buffering
+        self.errors = []
+        self._queue = queue.Queue(maxsize)
+        self._spilled = deque()
+        self._synced = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._metrics = {
+            'written': 0,
+            'bytes': 0,
+            'seconds': 0.0,
+            'spilled': 0,
+            'blocked': 0.0,
+            'max_depth': 0
+        }
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, file_name, data, header=None):
+        """
+        Queue a fits file to be written
+         file_name (str): Name of the fits file.
+         data (ndarray): Image data, it must not be modified until the file has been written.
+         header (object): FITS header.
+        """
+        if not self._thread.is_alive():
+            raise Exception("FitsWriter is closed.")
+        with self._lock:
+            self._pending += 1
+        job = (file_name, data, header)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            if self.spool is not None:
+                try:
+                    self._spill(job)
+                except Exception:
+                    with self._lock:
+                        self._pending -= 1
+                        self._idle.notify_all()
+                    raise
+            else:
+                # backpressure, the acquisition waits for the disk
+                t = time.time()
+                self._queue.put(job)
+                with self._lock:
+                    self._metrics['blocked'] += time.time() - t
+        with self._lock:
+            self._metrics['max_depth'] = max(self._metrics['max_depth'], self._queue.qsize())
+
+    def _spill(self, job):
+        """
+        Write a job to the spool directory, it is moved to its final name by the writer thread
+        """
+        file_name, data, header = job
+        spool_name = os.path.join(self.spool, os.path.basename(file_name))
+        self._write(spool_name, data, header)
+        with self._lock:
+            self._metrics['spilled'] += 1
+            self._spilled.append((spool_name, file_name))
+
+    def _write(self, file_name, data, header):
+        """
+        Write a fits file with buffered sequential I/O, return the number of bytes written
+        The partial file is removed if the write fails.
+        """
+        try:
+            with open(file_name, 'wb', buffering=self.buffering) as f:
+                fits.PrimaryHDU(data=data, header=header).writeto(f)
+                return f.tell()
+        except BaseException:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            raise
+
+    def _sync(self):
+        """
+        Sync the files written since the last sync and rename them to their final name
+        """
+        directories = set()
+        for part_name, file_name in self._synced:
+            if self.fsync:
+                fd = os.open(part_name, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            os.replace(part_name, file_name)
+            directories.add(os.path.dirname(os.path.abspath(file_name)))
+        if self.fsync:
+            # the renames are durable once the directories are synced
+            for directory in directories:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        self._synced = []
+
+    def _run(self):
+        """
+        Writer thread, stops on a None job once the spilled files have been moved
+        Files are only spilled while the queue is full, so a job always follows to move them.
+        """
+        while True:
+            job = self._queue.get()
+            done = 1
+            if job:
+                file_name, data, header = job
+                t = time.time()
+                part_name = file_name + '.part'
+                try:
+                    size = self._write(part_name, data, header)
+                    self._synced.append((part_name, file_name))
+                    with self._lock:
+                        self._metrics['written'] += 1
+                        self._metrics['bytes'] += size
+                        self._metrics['seconds'] += time.time() - t
+                except Exception as e:
+                    self.errors.append(e)
+            while True:
+                with self._lock:
+                    spilled = self._spilled.popleft() if len(self._spilled) > 0 else None
+                if spilled is None:
+                    break
+                spool_name, file_name = spilled
+                try:
+                    shutil.move(spool_name, file_name + '.part')
+                    self._synced.append((file_name + '.part', file_name))
+                except Exception as e:
+                    self.errors.append(e)
+                    if os.path.exists(file_name + '.part'):
+                        os.remove(file_name + '.part')
+                done += 1
+            # sync in batches of fsync files, or as soon as there is nothing left to write
+            if len(self._synced) > 0 and (len(self._synced) >= self.fsync or self._queue.empty() or job is None):
+                try:
+                    self._sync()
+                except Exception as e:
+                    self.errors.append(e)
+                    for part_name, file_name in self._synced:
+                        if os.path.exists(part_name):
+                            os.remove(part_name)
+                    self._synced = []
+            with self._lock:
+                self._pending -= done
+                self._idle.notify_all()
+            if job is None:
+                break
+
+    def flush(self, timeout=None):
+        """
+        Wait until all the files queued have been written, return False on timeout
+         timeout (float): Timeout in seconds, None waits forever.
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self):
+        """
+        Write the files queued and stop the writer thread
+        """
+        if self._thread.is_alive():
+            with self._lock:
+                self._pending += 1
+            self._queue.put(None)
+            self._thread.join()
+
+    @property
+    def metrics(self):
+        """
+        Return the queue depth and write throughput of the writer
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['depth'] = self._queue.qsize() + len(self._spilled)
+        if metrics['seconds'] > 0:
+            metrics['throughput'] = metrics['bytes'] / metrics['seconds'] / 1048576
+        else:
+            metrics['throughput'] = 0.0
+        return metrics
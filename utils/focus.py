@@ -0,0 +1,177 @@
+"""
+Focus class
+
+Star detection and image quality measurement (HFR, FWHM) with numpy, and autofocus.
+"""
+
+import time
+import numpy as np
+from astropy.table import Table
+
+class Focus(object):
+    """
+    Class for measuring stars and focusing.
+     threshold = detection threshold in noise sigma
+     radius = radius of the measurement box in pixels
+     maxstars = number of brightest stars measured
+    """
+
+    def __init__(self, threshold=5.0, radius=8, maxstars=100):
+        self.threshold = threshold
+        self.radius = radius
+        self.maxstars = maxstars
+        self.saturation = None
+        self.curve = Table()
+
+    def background(self, data, step=4, iterations=3, kappa=3.0):
+        """
+        Return the sky background and noise of an image, sigma clipped median and MAD
+         data (ndarray): Image.
+         step (int): Every step pixel in both directions is sampled.
+        """
+        sample = np.asarray(data[::step, ::step], dtype=np.float32).ravel()
+        for i in range(iterations):
+            median = np.median(sample)
+            noise = 1.4826 * np.median(np.abs(sample - median))
+            if noise <= 0:
+                break
+            sample = sample[np.abs(sample - median) < kappa * noise]
+        median = float(np.median(sample))
+        noise = float(1.4826 * np.median(np.abs(sample - median)))
+        return median, max(noise, 1e-6)
+
+    def detect(self, data):
+        """
+        Return the (Y, X) pixel positions of the stars of an image, brightest first, and the image minus its background
+         data (ndarray): Image.
+        Stars are local maxima above threshold sigma whose 4 neighbours are above the noise too, so hot pixels
+        are rejected. Stars closer than radius to a brighter one or to the edge are dropped.
+        """
+        sky, noise = self.background(data)
+        img = np.asarray(data, dtype=np.float32) - sky
+        r = self.radius
+        core = img[1:-1, 1:-1]
+        peaks = core > self.threshold * noise
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    peaks &= core >= img[1+dy:img.shape[0]-1+dy, 1+dx:img.shape[1]-1+dx]
+        neighbours = np.minimum(np.minimum(img[:-2, 1:-1], img[2:, 1:-1]), np.minimum(img[1:-1, :-2], img[1:-1, 2:]))
+        peaks &= neighbours > 2 * noise
+        if self.saturation is not None:
+            peaks &= np.asarray(data)[1:-1, 1:-1] < self.saturation
+        ys, xs = np.nonzero(peaks)
+        ys += 1
+        xs += 1
+        inside = (ys >= r) & (ys < img.shape[0] - r) & (xs >= r) & (xs < img.shape[1] - r)
+        ys, xs = ys[inside], xs[inside]
+        order = np.argsort(img[ys, xs])[::-1][:4 * self.maxstars]
+        ys, xs = ys[order], xs[order]
+        # drop the stars with a brighter one within radius
+        d2 = (ys[:, None] - ys[None, :]) ** 2 + (xs[:, None] - xs[None, :]) ** 2
+        crowded = np.tril(d2 < r * r, -1).any(axis=1)
+        ys, xs = ys[~crowded][:self.maxstars], xs[~crowded][:self.maxstars]
+        return ys, xs, img
+
+    def measure(self, data):
+        """
+        Return an astropy table of the stars of an image: X, Y (centroid), FLUX, PEAK, HFR and FWHM in pixels
+         data (ndarray): Image.
+        HFR is the flux weighted mean distance to the centroid, FWHM comes from the second moments.
+        All the stars are measured at once on a stack of boxes.
+        """
+        ys, xs, img = self.detect(data)
+        r = self.radius
+        offsets = np.arange(-r, r + 1)
+        boxes = img[ys[:, None, None] + offsets[None, :, None], xs[:, None, None] + offsets[None, None, :]]
+        boxes = np.clip(boxes, 0, None)
+        dy = offsets[None, :, None].astype(np.float32)
+        dx = offsets[None, None, :].astype(np.float32)
+        flux = boxes.sum(axis=(1, 2))
+        flux = np.where(flux > 0, flux, 1)
+        cy = (boxes * dy).sum(axis=(1, 2)) / flux
+        cx = (boxes * dx).sum(axis=(1, 2)) / flux
+        d2 = (dy - cy[:, None, None]) ** 2 + (dx - cx[:, None, None]) ** 2
+        # only the pixels within radius of the centroid, the corners of the boxes belong to the sky
+        weights = boxes * (d2 <= r * r)
+        total = weights.sum(axis=(1, 2))
+        total = np.where(total > 0, total, 1)
+        hfr = (weights * np.sqrt(d2)).sum(axis=(1, 2)) / total
+        sigma = np.sqrt((weights * d2).sum(axis=(1, 2)) / total / 2)
+        t = Table()
+        t['X'] = xs + cx
+        t['Y'] = ys + cy
+        t['FLUX'] = total
+        t['PEAK'] = img[ys, xs]
+        t['HFR'] = hfr
+        t['FWHM'] = 2.3548 * sigma
+        return t
+
+    def hfr(self, data):
+        """
+        Return the median HFR of the stars of an image, None if there is no star
+         data (ndarray): Image.
+        """
+        stars = self.measure(data)
+        if len(stars) == 0:
+            return None
+        return float(np.median(stars['HFR']))
+
+    def fit(self, positions, hfrs):
+        """
+        Return the best focus position of a focus curve and the fitted HFR there
+         positions (list): Focuser positions.
+         hfrs (list): Median HFR at each position.
+        The curve is a hyperbola, HFR^2 = a^2 (1 + (x - c)^2 / b^2), which is a parabola in HFR^2: its minimum
+        is found by linear least squares. Falls back to the best point if the curve is not convex.
+        """
+        x = np.asarray(positions, dtype=np.float64)
+        h = np.asarray(hfrs, dtype=np.float64)
+        best = int(np.argmin(h))
+        if len(x) < 3:
+            return x[best], h[best]
+        # centred and scaled for a well conditioned fit
+        x0 = x.mean()
+        scale = max(np.ptp(x), 1.0)
+        u = (x - x0) / scale
+        A, B, C = np.polyfit(u, h ** 2, 2)
+        if A <= 0:
+            return x[best], h[best]
+        umin = -B / (2 * A)
+        if umin < u.min() or umin > u.max():
+            return x[best], h[best]
+        return x0 + umin * scale, float(np.sqrt(max(C - B * B / (4 * A), 0)))
+
+    def autofocus(self, camera, focuser, exptime=1.0, step=50, points=9, roi=None, binning=None):
+        """
+        Run a focus curve around the current focuser position and move the focuser to the best focus
+         camera (object): CCDCam indilib object.
+         focuser (object): Focuser indilib object.
+         exptime (float): Exposure time in seconds.
+         step (int): Focuser steps between two points of the curve.
+         points (int): Number of points of the curve.
+         roi (dict): Region of the sensor used, see CCDCam.set_roi, the whole sensor if None.
+         binning (int): Binning used.
+        Return the best position, the focus curve is kept in curve.
+        """
+        start = focuser.position
+        positions = start + step * (np.arange(points) - (points - 1) // 2)
+        # the curve is run in one direction, so the backlash is the same at every point
+        measured = []
+        t = time.time()
+        for pos in positions:
+            pos = focuser.move(pos)
+            image = next(camera.focus_loop(exptime, roi=roi, binning=binning, count=1), None)
+            value = None if image is None else self.hfr(image)
+            measured.append((pos, np.nan if value is None else value))
+        self.curve = Table(rows=measured, names=['POSITION', 'HFR'])
+        valid = np.isfinite(self.curve['HFR'])
+        if valid.sum() == 0:
+            focuser.move(start)
+            raise Exception("Autofocus failed, no star found.")
+        best, hfr = self.fit(self.curve['POSITION'][valid], self.curve['HFR'][valid])
+        best = focuser.move(int(round(best)))
+        self.curve.meta['BEST'] = best
+        self.curve.meta['HFR'] = hfr
+        self.curve.meta['SECONDS'] = time.time() - t
+        return best
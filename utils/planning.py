@@ -33,6 +33,7 @@ class Planning(object):
         self.timerguider = 3
         self.timerfilter = 3
         self.timerfocus = 0
+        self.concurrent = True
         self.read   
 
     @property
@@ -221,10 +222,20 @@ class Planning(object):
         if self.available:
             duration = 0
             for exptime in self.observation[constant.MAST_t_exptime]:
-                duration = duration + float(exptime) + self.timergo + self.timerguider + self.timerslew + self.timerfilter + self.timerfocus
+                duration = duration + float(exptime) + self.overhead
             d = (self.timerinit+duration) * u.second                     
         return float(f'{d.to(u.hour).value:.6f}')
         
+    @property
+    def overhead(self):
+        """
+        Return the time between two exposures in seconds
+        With concurrent, slew, filter and focus run at the same time (Ciboulette.prepare), the guider starts after the slew.
+        """
+        if self.concurrent:
+            return self.timergo + max(self.timerslew + self.timerguider, self.timerfilter, self.timerfocus)
+        return self.timergo + self.timerguider + self.timerslew + self.timerfilter + self.timerfocus
+
     @property
     def number(self):
         """
@@ -0,0 +1,122 @@
+"""
+Sequencer class
+
+Run the steps of an observation (slew, filter, focus, guider...) in parallel, in the order of their dependencies.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from astropy.table import Table
+
+class Sequencer(object):
+    """
+    Class for running the device actions of an observation at the same time.
+    A step starts as soon as the steps it depends on are done, run returns once all the steps are done,
+    so the overhead of a target is its longest chain of steps instead of the sum of all of them.
+     workers = number of steps running at the same time
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.steps = {}
+        self.order = []
+        self.timings = Table()
+
+    def add(self, name, function, *args, after=(), **kwargs):
+        """
+        Add a step
+         name (str): Name of the step.
+         function (callable): Device action, it returns once the action is done.
+         after (list): Names of the steps to be done before this one, they must have been added before.
+        Return the name of the step.
+        """
+        if name in self.steps:
+            raise Exception("Step " + name + " already added.")
+        if isinstance(after, str):
+            after = (after,)
+        for dependency in after:
+            if dependency not in self.steps:
+                raise Exception("Step " + name + " depends on unknown step " + dependency + ".")
+        self.steps[name] = (function, args, kwargs, tuple(after))
+        self.order.append(name)
+        return name
+
+    def clear(self):
+        """
+        Remove all the steps
+        """
+        self.steps = {}
+        self.order = []
+
+    def _run_step(self, name, t0):
+        function, args, kwargs, after = self.steps[name]
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._times[name] = (start - t0, time.time() - start)
+
+    def run(self, timeout=None):
+        """
+        Run the steps and return their results in a dictionary by name
+         timeout (float): Timeout in seconds, None waits forever.
+        If a step fails the steps depending on it are skipped, the other ones are still run, and the first
+        failure is raised once they are done. The start and duration of each step are kept in timings.
+        """
+        t0 = time.time()
+        self._times = {}
+        results = {}
+        errors = {}
+        skipped = []
+        waiting = list(self.order)
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while len(waiting) > 0 or len(running) > 0:
+                for name in list(waiting):
+                    after = self.steps[name][3]
+                    if any(d in errors or d in skipped for d in after):
+                        waiting.remove(name)
+                        skipped.append(name)
+                    elif all(d in results for d in after):
+                        waiting.remove(name)
+                        running[pool.submit(self._run_step, name, t0)] = name
+                if len(running) == 0:
+                    break
+                remaining = None if timeout is None else timeout - (time.time() - t0)
+                if remaining is not None and remaining <= 0:
+                    # the steps running can not be stopped, only the ones waiting are dropped
+                    errors['timeout'] = Exception("Sequence timeout after " + str(timeout) + " s, " +
+                                                  "running " + ", ".join(running.values()) + ".")
+                    skipped.extend(waiting)
+                    waiting = []
+                    break
+                done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        errors[name] = e
+        finally:
+            # the steps still running after a timeout are left to finish on their own
+            pool.shutdown(wait='timeout' not in errors)
+        rows = []
+        for name in self.order:
+            start, seconds = self._times.get(name, (float('nan'), float('nan')))
+            if name in results:
+                status = 'Ok'
+            elif name in errors:
+                status = 'Failed'
+            elif name in skipped:
+                status = 'Skipped'
+            else:
+                status = 'Running'
+            rows.append((name, start, seconds, status))
+        self.timings = Table(rows=rows, names=['STEP', 'START', 'SECONDS', 'STATUS'], dtype=[str, float, float, str])
+        self.timings.meta['SECONDS'] = time.time() - t0
+        self.timings.meta['SUM'] = float(sum(seconds for _, seconds in list(self._times.values())))
+        if len(errors) > 0:
+            name = next(n for n in self.order + ['timeout'] if n in errors)
+            raise errors[name]
+        return results